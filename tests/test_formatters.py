@@ -11,6 +11,8 @@ from ws_api.formatters import (
     _format_institutional_transfer,
     _format_internal_transfer,
     _format_trade,
+    collect_activity_lookups,
+    format_activity_description,
 )
 
 
@@ -189,6 +191,13 @@ class TestFormatEft:
         assert _format_eft(act, api) is True
         assert act["description"] == "Deposit: EFT from Savings ****1234"
 
+    def test_missing_details(self):
+        api = MagicMock()
+        api.get_etf_details.return_value = None
+        act = {"type": "DEPOSIT", "subType": "EFT", "externalCanonicalId": "ext-5"}
+        assert _format_eft(act, api) is True
+        assert act["description"] == "Deposit: EFT from None None"
+
     def test_non_eft_subtype(self):
         api = self._mock_api()
         act = {
@@ -205,7 +214,8 @@ class TestFormatEft:
 class TestFormatInternalTransfer:
     def _mock_api(self, accounts=None):
         api = MagicMock()
-        api.get_accounts.return_value = accounts or []
+        accounts_by_id = {acc["id"]: acc for acc in accounts or []}
+        api.get_account_by_id.side_effect = accounts_by_id.get
         return api
 
     def test_source_with_matching_account(self):
@@ -235,6 +245,20 @@ class TestFormatInternalTransfer:
         assert _format_internal_transfer(act, api) is True
         assert act["description"] == "Money transfer: from Wealthsimple Cash (DEF456)"
 
+    def test_context_without_get_account_by_id(self):
+        class LegacyContext:
+            def get_accounts(self, open_only):
+                assert open_only is False
+                return [{"id": "acc-1", "description": "Cash", "number": "DEF456"}]
+
+        act = {
+            "type": "INTERNAL_TRANSFER",
+            "subType": "DESTINATION",
+            "opposingAccountId": "acc-1",
+        }
+        assert _format_internal_transfer(act, LegacyContext()) is True
+        assert act["description"] == "Money transfer: from Wealthsimple Cash (DEF456)"
+
     def test_asset_movement_type(self):
         accounts = [{"id": "acc-3", "description": "RRSP: managed", "number": "GHI789"}]
         api = self._mock_api(accounts)
@@ -407,3 +431,86 @@ class TestFormatCorporateActionSubdivision:
         api = self._mock_api()
         act = {"type": "CORPORATE_ACTION", "subType": "MERGER"}
         assert _format_corporate_action_subdivision(act, api) is False
+
+
+# --- format_activity_description ---
+
+
+class TestFormatActivityDescription:
+    def test_unknown_type_keeps_generic_description(self):
+        act = {"type": "SOMETHING_NEW", "subType": "WHATEVER"}
+        format_activity_description(act, MagicMock())
+        assert act["description"] == "SOMETHING_NEW: WHATEVER"
+
+    def test_any_type_with_eft_subtype(self):
+        api = MagicMock()
+        api.get_etf_details.return_value = {
+            "source": {"bankAccount": {"nickname": "Bank", "accountNumber": "12"}}
+        }
+        act = {"type": "DEPOSIT", "subType": "EFT", "externalCanonicalId": "ext-1"}
+        format_activity_description(act, api)
+        assert act["description"] == "Deposit: EFT from Bank 12"
+
+    def test_type_wildcard_takes_precedence_over_eft(self):
+        api = MagicMock()
+        api.get_account_by_id.return_value = None
+        act = {
+            "type": "INTERNAL_TRANSFER",
+            "subType": "EFT",
+            "opposingAccountId": "acc-1",
+        }
+        format_activity_description(act, api)
+        assert act["description"] == "Money transfer: from Wealthsimple acc-1"
+
+    @pytest.mark.parametrize(
+        "sub_type, expected",
+        [(None, "Referral"), ("OTHER", "REFERRAL: OTHER")],
+    )
+    def test_exact_subtype_match(self, sub_type, expected):
+        act = {"type": "REFERRAL", "subType": sub_type}
+        format_activity_description(act, MagicMock())
+        assert act["description"] == expected
+
+    def test_prefetched_lookups_are_used(self):
+        api = MagicMock()
+        act = {"type": "DIVIDEND", "subType": None, "securityId": "sec-1"}
+        prefetch = {"security_id_to_symbol": {"sec-1": "TSX:XEQT"}}
+        format_activity_description(act, api, prefetch)
+        assert act["description"] == "Dividend: TSX:XEQT"
+        api.security_id_to_symbol.assert_not_called()
+
+
+# --- collect_activity_lookups ---
+
+
+def test_collect_activity_lookups():
+    acts = [
+        {"type": "DIY_BUY", "subType": "MARKET_ORDER", "securityId": "sec-1"},
+        {"type": "DIVIDEND", "subType": None, "securityId": "sec-1"},
+        {"type": "WITHDRAWAL", "subType": "EFT", "externalCanonicalId": "funding-1"},
+        {
+            "type": "INSTITUTIONAL_TRANSFER_INTENT",
+            "subType": "TRANSFER_IN",
+            "externalCanonicalId": "xfer-1",
+        },
+        {
+            "type": "INSTITUTIONAL_TRANSFER_INTENT",
+            "subType": "TRANSFER_OUT",
+            "externalCanonicalId": "xfer-2",
+        },
+        {
+            "type": "CORPORATE_ACTION",
+            "subType": "SUBDIVISION",
+            "canonicalId": "ca-1",
+            "currency": None,
+            "securityId": "sec-2",
+        },
+        {"type": "INTEREST", "subType": None},
+    ]
+    assert collect_activity_lookups(acts) == {
+        "security_id_to_symbol": {"sec-1"},
+        "get_etf_details": {"funding-1"},
+        "get_transfer_details": {"xfer-1"},
+        "get_corporate_action_child_activities": {"ca-1"},
+        "get_security_market_data": {"sec-2"},
+    }
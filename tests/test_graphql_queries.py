@@ -0,0 +1,45 @@
+import pytest
+
+from ws_api.graphql_queries import (
+    GRAPHQL_QUERIES,
+    GRAPHQL_QUERIES_MINIFIED,
+    load_query,
+    minify_query,
+)
+
+
+def test_minify_query():
+    query = (
+        'query Q($id: ID!, $range: String! = "1 d") {\n'
+        "  security(id: $id) {\n"
+        "    id\n"
+        "    ...Fields\n"
+        "  }\n"
+        "}\n\n"
+        "fragment Fields on Security {\n  name\n}"
+    )
+    assert minify_query(query) == (
+        'query Q($id:ID!,$range:String!="1 d"){security(id:$id){id ...Fields}}'
+        "fragment Fields on Security{name}"
+    )
+
+
+def test_all_queries_minified():
+    assert GRAPHQL_QUERIES_MINIFIED.keys() == GRAPHQL_QUERIES.keys()
+    for name, query in GRAPHQL_QUERIES_MINIFIED.items():
+        assert "\n" not in query
+        assert len(query) < len(GRAPHQL_QUERIES[name])
+        assert query.startswith(f"query {name}(")
+
+
+def test_queries_are_loaded_from_files():
+    assert "FetchSecurityMarketData" in GRAPHQL_QUERIES
+    query = GRAPHQL_QUERIES["FetchSecurityMarketData"]
+    assert query.startswith("query FetchSecurityMarketData($id: ID!) {\n")
+    assert load_query("FetchSecurityMarketData") is query
+
+
+def test_unknown_query():
+    assert "FetchNothing" not in GRAPHQL_QUERIES
+    with pytest.raises(KeyError):
+        GRAPHQL_QUERIES["FetchNothing"]
@@ -1,4 +1,5 @@
 import json
+import pickle
 
 from ws_api.session import OAuthSession, WSAPISession
 
@@ -59,3 +60,24 @@ def test_wsapi_session_from_json():
     assert session.session_id == "test_session_id"
     assert session.wssdi == "test_wssdi"
     assert session.token_info == {"key": "value"}
+
+
+def test_wsapi_session_json_bytes_round_trip():
+    session = WSAPISession(
+        client_id="test_client_id",
+        access_token="test_access_token",
+        token_info={"identity_canonical_id": "identity-é"},
+    )
+
+    json_bytes = session.to_json_bytes()
+
+    assert isinstance(json_bytes, bytes)
+    assert WSAPISession.from_json(json_bytes) == session
+    assert WSAPISession.from_json(session.to_json()) == session
+
+
+def test_wsapi_session_uses_slots():
+    session = WSAPISession(client_id="test_client_id", token_info={"key": "value"})
+
+    assert not hasattr(session, "__dict__")
+    assert pickle.loads(pickle.dumps(session)) == session
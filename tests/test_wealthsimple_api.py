@@ -1,8 +1,11 @@
+import json
 import uuid
 from unittest.mock import MagicMock, patch
 
 import pytest
+from requests.structures import CaseInsensitiveDict
 
+from ws_api.exceptions import CurlException
 from ws_api.session import WSAPISession
 from ws_api.wealthsimple_api import WealthsimpleAPI, WealthsimpleAPIBase
 
@@ -16,7 +19,10 @@ def test_wealthsimple_api_uuidv4():
     uuid_str = WealthsimpleAPI.uuidv4()
     assert isinstance(uuid_str, str)
     assert len(uuid_str) == 36
-    uuid.UUID(uuid_str, version=4)
+    parsed = uuid.UUID(uuid_str)
+    assert str(parsed) == uuid_str
+    assert parsed.version == 4
+    assert parsed.variant == uuid.RFC_4122
 
 
 @pytest.fixture
@@ -30,6 +36,37 @@ def mock_session():
     return sess
 
 
+def test_start_session_scrapes_login_page():
+    login_headers = CaseInsensitiveDict(
+        {
+            "Content-Type": "text/html",
+            # requests joins repeated headers with commas
+            "Set-Cookie": "other=1; path=/, xwssdi=fff; path=/, wssdi=abc-123; path=/",
+        }
+    )
+    login_page = (
+        "<html>\n"
+        "<p>set-cookie: wssdi=fff; in the body is ignored</p>\n"
+        '<script defer src="https://cdn.example.com/app-0123abcd.js"></script>\n'
+        "</html>"
+    )
+    app_js = 'x={"production":{env:"p",clientId:"c0ffee"}}'
+
+    with patch.object(
+        WealthsimpleAPIBase,
+        "send_get",
+        side_effect=[(login_headers, login_page), ({}, app_js)],
+    ) as mock_get:
+        api = WealthsimpleAPIBase()
+
+    assert api.session.wssdi == "abc-123"
+    assert api.session.client_id == "c0ffee"
+    assert api.session.session_id is not None
+    assert mock_get.call_args_list[1].args[0] == (
+        "https://cdn.example.com/app-0123abcd.js"
+    )
+
+
 def test_wealthsimple_api_init_with_session(mock_session):
     api = WealthsimpleAPI(mock_session)
     assert api.session.client_id == "test_client_id"
@@ -39,10 +76,10 @@ def test_wealthsimple_api_init_with_session(mock_session):
     assert api.session.wssdi == "test_wssdi"
 
 
-@patch("requests.request")
+@patch("requests.Session.request")
 def test_send_http_request_post(mock_request, mock_session):
     mock_resp = MagicMock()
-    mock_resp.json.return_value = {"status": "ok"}
+    mock_resp.content = b'{"status": "ok"}'
     mock_request.return_value = mock_resp
 
     api = WealthsimpleAPIBase(mock_session)
@@ -59,7 +96,7 @@ def test_send_http_request_post(mock_request, mock_session):
     args, kwargs = mock_request.call_args
     assert args[0] == "POST"
     assert args[1] == "https://test.example.com/api"
-    assert kwargs["json"] == {
+    assert json.loads(kwargs["data"]) == {
         "grant_type": "password",
         "username": "test",
         "password": "test",
@@ -71,10 +108,10 @@ def test_send_http_request_post(mock_request, mock_session):
     assert headers["x-ws-device-id"] == "test_wssdi"
 
 
-@patch("requests.request")
+@patch("requests.Session.request")
 def test_send_get_request(mock_request, mock_session):
     mock_resp = MagicMock()
-    mock_resp.json.return_value = {"status": "ok"}
+    mock_resp.content = b'{"status": "ok"}'
     mock_request.return_value = mock_resp
 
     api = WealthsimpleAPIBase(mock_session)
@@ -90,3 +127,58 @@ def test_send_get_request(mock_request, mock_session):
     headers = kwargs["headers"]
     assert "x-ws-session-id" in headers
     assert headers["x-ws-session-id"] == "test_session_id"
+    assert kwargs["data"] is None
+
+
+@patch("requests.Session.request")
+def test_send_http_request_invalid_json(mock_request, mock_session):
+    mock_resp = MagicMock()
+    mock_resp.content = b"<html>Bad Gateway</html>"
+    mock_request.return_value = mock_resp
+
+    api = WealthsimpleAPIBase(mock_session)
+
+    with pytest.raises(CurlException):
+        api.send_get("https://test.example.com/get")
+
+
+@patch("requests.Session.request")
+def test_send_http_request_does_not_mutate_headers(mock_request, mock_session):
+    mock_resp = MagicMock()
+    mock_resp.content = b'{"data": {"security": {"id": "sec1"}}}'
+    mock_request.return_value = mock_resp
+
+    api = WealthsimpleAPIBase(mock_session)
+    graphql_headers = dict(WealthsimpleAPIBase._GRAPHQL_HEADERS)
+
+    api.do_graphql_query(
+        "FetchSecurityMarketData", {"id": "sec1"}, "security", "object"
+    )
+
+    assert dict(WealthsimpleAPIBase._GRAPHQL_HEADERS) == graphql_headers
+    headers = mock_request.call_args.kwargs["headers"]
+    assert headers["x-ws-api-version"] == WealthsimpleAPIBase.GRAPHQL_VERSION
+    assert headers["Authorization"] == "Bearer test_access_token"
+
+
+def test_authorization_header_follows_access_token(mock_session):
+    api = WealthsimpleAPIBase(mock_session)
+    assert api._authorization_header() == "Bearer test_access_token"
+
+    api.session.access_token = "new_access_token"
+    assert api._authorization_header() == "Bearer new_access_token"
+
+
+def test_http_session_pools_connections(mock_session):
+    api = WealthsimpleAPIBase(mock_session)
+    adapter = api._http.get_adapter(WealthsimpleAPIBase.GRAPHQL_URL)
+    assert adapter is api._http.get_adapter(WealthsimpleAPIBase.OAUTH_BASE_URL)
+    assert adapter.max_retries.total == 3
+    assert adapter._pool_maxsize == 32
+
+
+def test_context_manager_closes_http_session(mock_session):
+    with patch("requests.Session.close") as mock_close:
+        with WealthsimpleAPIBase(mock_session) as api:
+            assert isinstance(api, WealthsimpleAPIBase)
+        mock_close.assert_called_once()
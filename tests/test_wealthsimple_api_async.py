@@ -0,0 +1,102 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from ws_api.session import WSAPISession
+from ws_api.wealthsimple_api_async import WealthsimpleAPIAsync
+
+
+@pytest.fixture
+def api():
+    sess = WSAPISession()
+    sess.client_id = "test_client_id"
+    sess.access_token = "test_access_token"
+    sess.session_id = "test_session_id"
+    sess.wssdi = "test_wssdi"
+    return WealthsimpleAPIAsync(sess)
+
+
+def _mock_graphql(api, handler):
+    api._async_http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_get_account_balances_many(api):
+    def handler(request):
+        query = json.loads(request.content)
+        assert query["operationName"] == "FetchAccountsWithBalance"
+        assert request.headers["Authorization"] == "Bearer test_access_token"
+        account_id = query["variables"]["ids"][0]
+        balance = {"securityId": "sec-c-cad", "quantity": f"{account_id}-qty"}
+        account = {"custodianAccounts": [{"financials": {"balance": [balance]}}]}
+        return httpx.Response(200, json={"data": {"accounts": [account]}})
+
+    _mock_graphql(api, handler)
+
+    balances = asyncio.run(api.get_account_balances_many(["acc1", "acc2"]))
+
+    assert balances == {
+        "acc1": {"sec-c-cad": "acc1-qty"},
+        "acc2": {"sec-c-cad": "acc2-qty"},
+    }
+
+
+def test_do_graphql_query_async_load_all_pages(api):
+    pages = {
+        None: ([{"node": {"id": "act1"}}], True, "cursor1"),
+        "cursor1": ([{"node": {"id": "act2"}}], False, None),
+    }
+
+    def handler(request):
+        variables = json.loads(request.content)["variables"]
+        edges, has_next_page, end_cursor = pages[variables.get("cursor")]
+        feed = {
+            "edges": edges,
+            "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+        }
+        return httpx.Response(200, json={"data": {"activityFeedItems": feed}})
+
+    _mock_graphql(api, handler)
+
+    activities = asyncio.run(
+        api.do_graphql_query_async(
+            "FetchActivityFeedItems",
+            {},
+            "activityFeedItems.edges",
+            "array",
+            load_all_pages=True,
+        )
+    )
+
+    assert activities == [{"id": "act1"}, {"id": "act2"}]
+
+
+def test_do_graphql_queries(api):
+    def handler(request):
+        security_id = json.loads(request.content)["variables"]["id"]
+        security = {"id": security_id, "stock": {"symbol": security_id.upper()}}
+        return httpx.Response(200, json={"data": {"security": security}})
+
+    _mock_graphql(api, handler)
+
+    results = asyncio.run(
+        api.do_graphql_queries(
+            [
+                ("FetchSecurityMarketData", {"id": "sec-a"}, "security", "object"),
+                ("FetchSecurityMarketData", {"id": "sec-b"}, "security", "object"),
+            ]
+        )
+    )
+
+    assert [security["stock"]["symbol"] for security in results] == ["SEC-A", "SEC-B"]
+
+
+def test_from_token_returns_async_client(api):
+    with patch.object(WealthsimpleAPIAsync, "check_oauth_token") as mock_check:
+        ws = WealthsimpleAPIAsync.from_token(api.session)
+
+    assert type(ws) is WealthsimpleAPIAsync
+    mock_check.assert_called_once_with(None, None)
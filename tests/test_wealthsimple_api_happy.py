@@ -1,8 +1,22 @@
+import base64
+import io
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
 from unittest.mock import MagicMock, patch
 
 import pytest
+from requests.structures import CaseInsensitiveDict
 
-from ws_api.exceptions import WSApiException
+from ws_api.exceptions import (
+    ManualLoginRequired,
+    UnexpectedException,
+    WSApiException,
+)
 from ws_api.formatters import format_account_description
 from ws_api.session import WSAPISession
 from ws_api.wealthsimple_api import WealthsimpleAPI, WealthsimpleAPIBase
@@ -27,27 +41,32 @@ def api():
     return WealthsimpleAPI()
 
 
+def _fake_jwt(claims: dict) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload.decode()}.signature"
+
+
 def test_send_http_request_return_headers(api_base):
     """Test send_http_request with return_headers=True path."""
-    with patch("ws_api.wealthsimple_api.requests.request") as mock_request:
+    with patch("ws_api.wealthsimple_api.requests.Session.request") as mock_request:
         mock_resp = MagicMock()
-        mock_resp.headers = {"Set-Cookie": "wssdi=test; path=/"}
+        mock_resp.headers = CaseInsensitiveDict({"Set-Cookie": "wssdi=test; path=/"})
         mock_resp.text = "response body"
         mock_request.return_value = mock_resp
 
-        result = api_base.send_http_request(
+        headers, body = api_base.send_http_request(
             "https://test.com", "GET", return_headers=True
         )
 
-        expected_headers = "Set-Cookie: wssdi=test; path=/\r\n\r\nresponse body"
-        assert result == expected_headers
+        assert headers["set-cookie"] == "wssdi=test; path=/"
+        assert body == "response body"
 
 
 def test_send_post(api_base):
     """Test send_post delegation."""
-    with patch("ws_api.wealthsimple_api.requests.request") as mock_request:
+    with patch("ws_api.wealthsimple_api.requests.Session.request") as mock_request:
         mock_resp = MagicMock()
-        mock_resp.json.return_value = {"ok": True}
+        mock_resp.content = b'{"ok": true}'
         mock_request.return_value = mock_resp
 
         result = api_base.send_post("https://test.com", {"data": 1})
@@ -87,6 +106,217 @@ def test_check_oauth_token_refresh(api_base):
         assert api_base.session.refresh_token == "new_refresh"
 
 
+def test_check_oauth_token_unhashable_persist_callback(api_base):
+    """Test callable objects that are not hashable can persist the session."""
+
+    @dataclass
+    class Persister:
+        saved: list
+
+        def __call__(self, session_json, username):
+            self.saved.append((session_json, username))
+
+    persist = Persister([])
+    api_base.session.access_token = _fake_jwt({"exp": int(time.time()) - 10})
+    api_base.session.refresh_token = "old_refresh"
+
+    with patch.object(api_base, "send_post") as mock_post:
+        mock_post.return_value = {
+            "access_token": "new_access",
+            "refresh_token": "new_refresh",
+        }
+        api_base.check_oauth_token(persist, "user")
+
+    assert persist.saved == [(api_base.session.to_json(), "user")]
+
+
+def test_check_oauth_token_valid_expiry_skips_probe(api_base):
+    """Test check_oauth_token trusts a token_info expiry in the future."""
+    api_base.session.access_token = "access"
+    api_base.session.refresh_token = "refresh"
+    api_base.session.token_info = {"expires_at": time.time() + 1800}
+
+    with (
+        patch.object(api_base, "send_post") as mock_post,
+        patch.object(api_base, "search_security") as mock_search,
+    ):
+        api_base.check_oauth_token()
+
+        mock_search.assert_not_called()
+        mock_post.assert_not_called()
+
+
+def test_check_oauth_token_expired_refreshes_without_probe(api_base):
+    """Test check_oauth_token refreshes an expired token without probing the API."""
+    api_base.session.access_token = "old_access"
+    api_base.session.refresh_token = "old_refresh"
+    api_base.session.token_info = {
+        "identity_canonical_id": "fake_id",
+        "expires_in": 1800,
+        "expires_at": time.time() - 10,
+    }
+
+    with (
+        patch.object(api_base, "send_post") as mock_post,
+        patch.object(api_base, "search_security") as mock_search,
+    ):
+        mock_post.return_value = {
+            "access_token": "new_access",
+            "refresh_token": "new_refresh",
+            "created_at": 1700000000,
+            "expires_in": 1800,
+        }
+        api_base.check_oauth_token()
+
+        mock_search.assert_not_called()
+        mock_post.assert_called_once()
+        assert api_base.session.access_token == "new_access"
+        token_info = api_base.session.token_info
+        assert token_info["created_at"] == 1700000000
+        assert token_info["expires_in"] == 1800
+        assert abs(token_info["expires_at"] - (time.time() + 1800)) < 5
+
+
+def test_token_info_expires_in_is_time_left(api_base):
+    """Test token info's expires_in counts from when it is received, not created_at."""
+    token_info = {
+        "resource_owner_id": 12345,
+        "scope": ["invest.read", "trade.read", "tax.read"],
+        "expires_in": 600,
+        "application": {"uid": "4da53ac2b03225bed1550eba8e4611e0"},
+        "created_at": int(time.time()) - 1200,
+        "identity_canonical_id": "identity-abc",
+    }
+    api_base.session.access_token = "access"
+    api_base.session.refresh_token = "refresh"
+
+    with patch.object(api_base, "send_get", return_value=dict(token_info)):
+        expires_at = api_base.get_token_info()["expires_at"]
+    assert abs(expires_at - (time.time() + 600)) < 5
+    assert api_base._access_token_expires_at() == expires_at
+
+    # Persisted without expires_at (e.g. by an older version), when it was received
+    # is unknown, so the token is probed instead of trusting created_at
+    api_base.session.token_info = token_info
+    assert api_base._access_token_expires_at() is None
+    with (
+        patch.object(api_base, "send_post") as mock_post,
+        patch.object(api_base, "search_security") as mock_search,
+    ):
+        api_base.check_oauth_token()
+
+        mock_search.assert_called_once()
+        mock_post.assert_not_called()
+
+
+def test_check_oauth_token_uses_jwt_expiry(api_base):
+    """Test check_oauth_token trusts the exp claim of a JWT access token."""
+    api_base.session.access_token = _fake_jwt({"exp": int(time.time()) + 1800})
+    api_base.session.refresh_token = "refresh"
+
+    with (
+        patch.object(api_base, "send_post") as mock_post,
+        patch.object(api_base, "search_security") as mock_search,
+    ):
+        api_base.check_oauth_token()
+
+        mock_search.assert_not_called()
+        mock_post.assert_not_called()
+
+
+def test_check_oauth_token_expired_jwt_refreshes(api_base):
+    """Test check_oauth_token refreshes a JWT access token whose exp has passed."""
+    api_base.session.access_token = _fake_jwt({"exp": int(time.time()) - 10})
+    api_base.session.refresh_token = "old_refresh"
+
+    with (
+        patch.object(api_base, "send_post") as mock_post,
+        patch.object(api_base, "search_security") as mock_search,
+    ):
+        mock_post.return_value = {
+            "access_token": "new_access",
+            "refresh_token": "new_refresh",
+        }
+        api_base.check_oauth_token()
+
+        mock_search.assert_not_called()
+        mock_post.assert_called_once()
+        assert api_base.session.access_token == "new_access"
+
+
+def test_do_graphql_query_refreshes_revoked_token(api_base):
+    """Test a query rejected as Not Authorized refreshes the token and is retried."""
+    api_base.session.access_token = _fake_jwt({"exp": int(time.time()) + 1800})
+    api_base.session.refresh_token = "old_refresh"
+    persisted = []
+    api_base.check_oauth_token(persisted.append)
+    not_authorized = {"errors": [{"message": "Not Authorized."}]}
+    responses = [
+        not_authorized,
+        {"access_token": "new_access", "refresh_token": "new_refresh"},
+        {"data": {"security": {"id": "sec1"}}},
+    ]
+
+    with patch.object(api_base, "send_post", side_effect=responses) as mock_post:
+        result = api_base.do_graphql_query(
+            "FetchSecurityMarketData", {"id": "sec1"}, "security", "object"
+        )
+
+    assert result == {"id": "sec1"}
+    assert mock_post.call_args_list[1].args[0].endswith("/token")
+    assert api_base.session.access_token == "new_access"
+    assert persisted == [api_base.session.to_json()]
+
+    # Retried only once
+    responses = [
+        not_authorized,
+        {"access_token": "newer_access", "refresh_token": "newer_refresh"},
+        not_authorized,
+    ]
+    with (
+        patch.object(api_base, "send_post", side_effect=responses),
+        pytest.raises(WSApiException),
+    ):
+        api_base.do_graphql_query(
+            "FetchSecurityMarketData", {"id": "sec1"}, "security", "object"
+        )
+
+    api_base.session.refresh_token = None
+    with (
+        patch.object(api_base, "send_post", return_value=not_authorized),
+        pytest.raises(ManualLoginRequired),
+    ):
+        api_base.do_graphql_query(
+            "FetchSecurityMarketData", {"id": "sec1"}, "security", "object"
+        )
+
+
+def test_check_oauth_token_concurrent_refresh(api_base):
+    """Test concurrent check_oauth_token calls refresh an expired token only once."""
+    api_base.session.access_token = _fake_jwt({"exp": int(time.time()) - 10})
+    api_base.session.refresh_token = "old_refresh"
+    new_access = _fake_jwt({"exp": int(time.time()) + 1800})
+
+    def refresh(url, data, headers):
+        time.sleep(0.1)
+        return {"access_token": new_access, "refresh_token": "new_refresh"}
+
+    with (
+        patch.object(api_base, "send_post", side_effect=refresh) as mock_post,
+        patch.object(api_base, "search_security"),
+    ):
+        threads = [
+            threading.Thread(target=api_base.check_oauth_token) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_post.assert_called_once()
+        assert api_base.session.access_token == new_access
+
+
 def test_login_internal_happy(api_base):
     """Test login_internal happy path."""
     api_base.session.client_id = "test_client"
@@ -125,6 +355,197 @@ def test_do_graphql_query_simple(api_base):
         assert result == [{"id": "acc1"}]
 
 
+def test_do_graphql_query_load_all_pages(api_base):
+    """Test do_graphql_query follows cursors until the last page."""
+    pages = [
+        {
+            "edges": [{"node": {"id": "act1"}}],
+            "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+        },
+        {
+            "edges": [{"node": {"id": "act2"}}],
+            "pageInfo": {"hasNextPage": True, "endCursor": "c2"},
+        },
+        {"edges": [{"node": {"id": "act3"}}], "pageInfo": {"hasNextPage": False}},
+    ]
+    with patch.object(api_base, "send_post") as mock_post:
+        mock_post.side_effect = [
+            {"data": {"activityFeedItems": page}} for page in pages
+        ]
+        result = api_base.do_graphql_query(
+            "FetchActivityFeedItems",
+            {},
+            "activityFeedItems.edges",
+            "array",
+            load_all_pages=True,
+        )
+
+        assert result == [{"id": "act1"}, {"id": "act2"}, {"id": "act3"}]
+        assert mock_post.call_count == 3
+        assert mock_post.call_args.kwargs["data"]["variables"] == {"cursor": "c2"}
+
+
+def test_do_graphql_query_cache(api_base):
+    """Test do_graphql_query(cache=True) reuses results until they expire."""
+    response = {"data": {"security": {"quoteHistory": [{"id": "q1"}, {"id": "q2"}]}}}
+    variables = {"id": "sec1", "timerange": "1m"}
+
+    def query(**kwargs):
+        return api_base.do_graphql_query(
+            "FetchSecurityHistoricalQuotes",
+            dict(variables),
+            "security.quoteHistory",
+            "array",
+            cache=True,
+            **kwargs,
+        )
+
+    with patch.object(api_base, "send_post", return_value=response) as mock_post:
+        assert query() == [{"id": "q1"}, {"id": "q2"}]
+        assert query(filter_fn=lambda q: q["id"] == "q2") == [{"id": "q2"}]
+        assert mock_post.call_count == 1
+
+        api_base.do_graphql_query(
+            "FetchSecurityHistoricalQuotes",
+            {"id": "sec2", "timerange": "1m"},
+            "security.quoteHistory",
+            "array",
+            cache=True,
+        )
+        assert mock_post.call_count == 2
+
+        with patch("time.monotonic", return_value=time.monotonic() + 61):
+            query()
+        assert mock_post.call_count == 3
+
+        api_base._clear_caches()
+        query()
+        assert mock_post.call_count == 4
+
+
+def test_do_graphql_query_factory(api_base):
+    """Test do_graphql_query converts each node with factory before filtering."""
+    edges = [{"node": {"id": "act1"}}, {"node": {"id": "act2"}}]
+    response = {"data": {"activityFeedItems": {"edges": edges}}}
+
+    def query(**kwargs):
+        return api_base.do_graphql_query(
+            "FetchActivityFeedItems",
+            {},
+            "activityFeedItems.edges",
+            "array",
+            lambda act_id: act_id != "act1",
+            factory=itemgetter("id"),
+            **kwargs,
+        )
+
+    with patch.object(api_base, "send_post", return_value=response):
+        assert query() == ["act2"]
+        assert query(cache=True) == ["act2"]
+        assert query(cache=True) == ["act2"]
+
+        with pytest.raises(UnexpectedException):
+            api_base.do_graphql_query(
+                "FetchSecurityMarketData",
+                {"id": "sec1"},
+                "security",
+                "object",
+                factory=dict,
+            )
+
+
+def test_do_graphql_query_null_in_path(api_base):
+    """Test do_graphql_query reports a null object along the path as a failure."""
+    with patch.object(api_base, "send_post") as mock_post:
+        mock_post.return_value = {"data": {"security": None}}
+        with pytest.raises(WSApiException):
+            api_base.do_graphql_query(
+                "FetchSecurityMarketData",
+                {"id": "sec1"},
+                "security.stock",
+                "object",
+            )
+
+
+def test_do_graphql_query_streaming(api_base):
+    """Test do_graphql_query_streaming yields filtered nodes across pages."""
+    pytest.importorskip("ijson")
+    pages = {
+        None: ([{"node": {"id": "act1"}}, {"node": {"id": "skip"}}], True, "c1"),
+        "c1": ([{"node": {"id": "act2", "amount": 1.5}}], False, None),
+    }
+
+    def fake_request(method, url, data=None, headers=None, stream=False):
+        assert stream
+        variables = json.loads(data)["variables"]
+        edges, has_next_page, end_cursor = pages[variables.get("cursor")]
+        feed = {
+            "edges": edges,
+            "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+        }
+        mock_resp = MagicMock()
+        mock_resp.__enter__.return_value = mock_resp
+        mock_resp.raw = io.BytesIO(
+            json.dumps({"data": {"activityFeedItems": feed}}).encode()
+        )
+        return mock_resp
+
+    with patch.object(api_base._http, "request", side_effect=fake_request):
+        activities = api_base.do_graphql_query_streaming(
+            "FetchActivityFeedItems",
+            {},
+            "activityFeedItems.edges",
+            lambda act: act["id"] != "skip",
+            load_all_pages=True,
+        )
+        assert list(activities) == [{"id": "act1"}, {"id": "act2", "amount": 1.5}]
+
+
+def _streamed_response(body: dict, status_code: int = 200):
+    mock_resp = MagicMock()
+    mock_resp.__enter__.return_value = mock_resp
+    mock_resp.ok = status_code < 400
+    mock_resp.status_code = status_code
+    mock_resp.content = json.dumps(body).encode()
+    mock_resp.raw = io.BytesIO(mock_resp.content)
+    return mock_resp
+
+
+def test_do_graphql_query_streaming_scalar_items(api_base):
+    """Test do_graphql_query_streaming yields array items that are not objects."""
+    pytest.importorskip("ijson")
+    body = {"data": {"security": {"tags": ["a", None, 2, ["b"], {"c": 3}]}}}
+    with patch.object(api_base._http, "request", return_value=_streamed_response(body)):
+        items = api_base.do_graphql_query_streaming(
+            "FetchSecurityMarketData", {"id": "sec1"}, "security.tags"
+        )
+        assert list(items) == ["a", None, 2, ["b"], {"c": 3}]
+
+
+def test_do_graphql_query_streaming_http_error(api_base):
+    """Test do_graphql_query_streaming reports HTTP errors with their response."""
+    pytest.importorskip("ijson")
+    response = _streamed_response({"message": "Not Authorized."}, 401)
+    with patch.object(api_base._http, "request", return_value=response):
+        items = api_base.do_graphql_query_streaming(
+            "FetchActivityFeedItems", {}, "activityFeedItems.edges"
+        )
+        with pytest.raises(WSApiException) as exc_info:
+            list(items)
+    assert exc_info.value.response == {"message": "Not Authorized."}
+
+
+def test_do_graphql_query_streaming_requires_ijson(api_base):
+    """Test do_graphql_query_streaming fails when called if ijson is missing."""
+    with (
+        patch("ws_api.wealthsimple_api.ijson", None),
+        pytest.raises(ImportError),
+    ):
+        api_base.do_graphql_query_streaming(
+            "FetchActivityFeedItems", {}, "activityFeedItems.edges"
+        )
+
+
 def test_get_token_info(api_base):
     """Test get_token_info with caching."""
     fake_info = {"identity_canonical_id": "fake_id"}
@@ -138,6 +559,95 @@ def test_get_token_info(api_base):
         mock_get.assert_called_once()
 
 
+def test_get_token_info_stores_expiry(api_base):
+    """Test get_token_info records when the cached token info expires."""
+    with patch.object(api_base, "send_get") as mock_get:
+        mock_get.return_value = {"identity_canonical_id": "fake_id", "expires_in": 1800}
+        before = time.time()
+        info = api_base.get_token_info()
+        assert before + 1800 <= info["expires_at"] <= time.time() + 1800
+        api_base.get_token_info()
+        mock_get.assert_called_once()
+
+
+def test_get_token_info_refetches_when_expired(api_base):
+    """Test get_token_info ignores a persisted token info that has expired."""
+    api_base.session.token_info = {
+        "identity_canonical_id": "old_id",
+        "expires_at": time.time() - 10,
+    }
+
+    with patch.object(api_base, "send_get") as mock_get:
+        mock_get.return_value = {"identity_canonical_id": "new_id", "expires_in": 1800}
+        assert api_base.get_token_info()["identity_canonical_id"] == "new_id"
+        mock_get.assert_called_once()
+
+
+def test_identity_canonical_id_from_jwt(api_base):
+    """Test the identity ID is read from the access token without an API call."""
+    api_base.session.access_token = _fake_jwt({"sub": "identity-abc", "exp": 1})
+
+    with patch.object(api_base, "send_get") as mock_get:
+        assert api_base._identity_canonical_id() == "identity-abc"
+        mock_get.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "access_token", ["opaque-token", _fake_jwt({"sub": "user-123"}), None]
+)
+def test_identity_canonical_id_falls_back_to_token_info(api_base, access_token):
+    """Test tokens without a usable identity claim fall back to get_token_info."""
+    api_base.session.access_token = access_token
+
+    with patch.object(api_base, "send_get") as mock_get:
+        mock_get.return_value = {"identity_canonical_id": "identity-xyz"}
+        assert api_base._identity_canonical_id() == "identity-xyz"
+        mock_get.assert_called_once()
+
+
+def test_from_token_restores_token_info():
+    """Test a persisted session's token info is reused, without an API call."""
+    sess = WSAPISession(
+        client_id="client",
+        access_token="opaque-token",
+        refresh_token="refresh",
+        session_id="session",
+        wssdi="wssdi",
+        token_info={
+            "identity_canonical_id": "identity-xyz",
+            "expires_at": time.time() + 1800,
+        },
+    )
+    restored = WSAPISession.from_json(sess.to_json())
+
+    with (
+        patch.object(WealthsimpleAPI, "send_get") as mock_get,
+        patch.object(WealthsimpleAPI, "send_post") as mock_post,
+    ):
+        ws = WealthsimpleAPI.from_token(restored)
+
+        assert ws.session.token_info == sess.token_info
+        assert ws.identity_id == "identity-xyz"
+        mock_get.assert_not_called()
+        mock_post.assert_not_called()
+
+
+def test_identity_id_is_memoized(api_base):
+    """Test identity_id is looked up once, and again after the caches are cleared."""
+    api_base.session.access_token = "opaque-token"
+
+    with patch.object(api_base, "send_get") as mock_get:
+        mock_get.return_value = {"identity_canonical_id": "identity-xyz"}
+        assert api_base.identity_id == "identity-xyz"
+        api_base.session.token_info = None
+        assert api_base.identity_id == "identity-xyz"
+        mock_get.assert_called_once()
+
+        api_base._clear_caches()
+        assert api_base.identity_id == "identity-xyz"
+        assert mock_get.call_count == 2
+
+
 @pytest.mark.parametrize(
     "unified_type, expected_desc",
     [
@@ -175,6 +685,24 @@ def test_account_add_description_cash(api):
     assert account["number"] == "cust123"
 
 
+def test_account_add_description_number_from_last_open_ws_custodian(api):
+    """Test the account number comes from the last open WS/TR custodian account."""
+    account = {
+        "id": "acc1",
+        "unifiedAccountType": "CASH",
+        "accountOwnerConfiguration": "SINGLE_OWNER",
+        "accountFeatures": [],
+        "custodianAccounts": [
+            {"branch": "WS", "id": "cust1", "status": "open"},
+            {"branch": "TR", "id": "cust2", "status": "open"},
+            {"branch": "WS", "id": "cust3", "status": "closed"},
+            {"branch": "XX", "id": "cust4", "status": "open"},
+        ],
+    }
+    format_account_description(account)
+    assert account["number"] == "cust2"
+
+
 def test_account_add_description_cash_joint(api):
     """Test CASH type with MULTI_OWNER returns 'Cash: joint'."""
     account = {
@@ -262,6 +790,307 @@ def test_get_account_balances(api):
         assert balances["sec-c-cad"] == 100.0
 
 
+def test_get_account_balances_batches_market_data(api):
+    """Test get_account_balances fetches the market data of all securities at once."""
+    balances = [
+        {"securityId": "sec-c-cad", "quantity": 100.0},
+        {"securityId": "sec1", "quantity": 2.0},
+        {"securityId": "sec2", "quantity": 3.0},
+    ]
+    account = {"custodianAccounts": [{"financials": {"balance": balances}}]}
+    cache = {}
+    api.security_market_data_cache_getter = cache.get
+    api.security_market_data_cache_setter = lambda sid, value: cache.setdefault(
+        sid, value
+    )
+    responses = [
+        {"data": {"accounts": [account]}},
+        {
+            "data": {
+                "s0": {"stock": {"primaryExchange": "TSX", "symbol": "AAA"}},
+                "s1": {"stock": {"primaryExchange": "NYSE", "symbol": "BBB"}},
+            }
+        },
+    ]
+    with patch.object(api, "send_post", side_effect=responses) as mock_post:
+        result = api.get_account_balances("acc_id")
+
+    assert mock_post.call_count == 2
+    assert mock_post.call_args.args[1]["variables"] == {"id0": "sec1", "id1": "sec2"}
+    assert result == {"sec-c-cad": 100.0, "TSX:AAA": 2.0, "NYSE:BBB": 3.0}
+
+
+def test_get_account_by_id(api):
+    """Test get_account_by_id looks accounts up in the cached accounts list."""
+    api.session.token_info = {"identity_canonical_id": "fake_id"}
+    fake_accounts = [
+        {"id": "acc1", "nickname": "Cash", "custodianAccounts": []},
+        {"id": "acc2", "nickname": "TFSA", "custodianAccounts": []},
+    ]
+    with patch.object(
+        api, "do_graphql_query", return_value=fake_accounts
+    ) as mock_query:
+        assert api.get_account_by_id("acc2")["description"] == "TFSA"
+        assert api.get_account_by_id("unknown") is None
+        mock_query.assert_called_once()
+
+
+def test_get_activities_interns_types(api):
+    """Test get_activities interns activity types and formats descriptions."""
+    act_type = json.loads('"INTEREST"')  # JSON-decoded strings are not interned
+    assert act_type is not sys.intern("INTEREST")
+    fake_activities = [{"type": act_type, "subType": None, "status": None}]
+    with patch.object(api, "do_graphql_query", return_value=fake_activities):
+        activities = api.get_activities("acc1")
+
+    assert activities[0]["type"] is sys.intern("INTEREST")
+    assert activities[0]["description"] == "Interest"
+
+
+def test_get_activities_preformatted_dates(api):
+    """Test get_activities passes pre-formatted date strings through as-is."""
+    end_date = api._iso_z(datetime(2024, 1, 31, 23, 59, 59))
+    with patch.object(api, "do_graphql_query", return_value=[]) as mock_query:
+        api.get_activities(
+            "acc1", start_date="2024-01-01T00:00:00.000000Z", end_date=end_date
+        )
+
+        condition = mock_query.call_args.args[1]["condition"]
+        assert condition["startDate"] == "2024-01-01T00:00:00.000000Z"
+        assert condition["endDate"] == "2024-01-31T23:59:59.000000Z"
+
+
+def test_get_activities_ignore_rejected(api):
+    """Test get_activities filters out rejected, cancelled and expired activities."""
+    statuses = [None, "REJECTED", "posted", "cancelled_by_user", "expired"]
+    edges = [
+        {"node": {"type": "INTEREST", "subType": None, "status": status}}
+        for status in statuses
+    ]
+    edges.append({"node": {"type": "LEGACY_TRANSFER", "status": "posted"}})
+    response = {"data": {"activityFeedItems": {"edges": edges}}}
+    with patch.object(api, "send_post", return_value=response):
+        activities = api.get_activities("acc1")
+        assert [act["status"] for act in activities] == [None, "posted"]
+
+        activities = api.get_activities("acc1", ignore_rejected=False)
+        assert [act["status"] for act in activities] == statuses
+
+
+@pytest.mark.parametrize(
+    "tz, expected",
+    [
+        ("UTC", "2026-10-15T23:59:59.999000Z"),
+        ("America/Toronto", "2026-10-16T03:59:59.999000Z"),
+        ("Asia/Tokyo", "2026-10-15T14:59:59.999000Z"),
+    ],
+)
+def test_get_activities_default_end_date(api, monkeypatch, tz, expected):
+    """Test get_activities defaults to the end of the local day, sent in UTC."""
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 10, 15, 21, 30)
+
+    monkeypatch.setenv("TZ", tz)
+    time.tzset()
+    try:
+        with (
+            patch("ws_api.wealthsimple_api.datetime", FrozenDatetime),
+            patch.object(api, "do_graphql_query", return_value=[]) as mock_query,
+        ):
+            api.get_activities("acc1")
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert mock_query.call_args.args[1]["condition"]["endDate"] == expected
+
+
+def test_iso_z_converts_aware_datetimes_to_utc(api):
+    """Test _iso_z sends aware datetimes in UTC, and naive ones as they are."""
+    toronto = timezone(timedelta(hours=-4))
+    aware = datetime(2026, 10, 15, 21, 30, tzinfo=toronto)
+    assert api._iso_z(aware) == "2026-10-16T01:30:00.000000Z"
+    assert api._iso_z(datetime(2026, 10, 15, 21, 30)) == "2026-10-15T21:30:00.000000Z"
+
+
+def _eft_deposit(funding_id: str) -> dict:
+    return {"type": "DEPOSIT", "subType": "EFT", "externalCanonicalId": funding_id}
+
+
+def _fake_funding(nickname: str) -> dict:
+    return {"source": {"bankAccount": {"nickname": nickname, "accountNumber": "12"}}}
+
+
+def test_format_activities_prefetches_each_lookup_once(api):
+    """Test format_activities fetches each distinct detail once, before formatting."""
+    acts = [_eft_deposit("funding1"), _eft_deposit("funding1"), _eft_deposit("f2")]
+    with patch.object(
+        api, "get_etf_details", side_effect=lambda key: _fake_funding(key)
+    ) as mock_etf:
+        api.format_activities(acts)
+
+    assert sorted(call.args[0] for call in mock_etf.call_args_list) == [
+        "f2",
+        "funding1",
+    ]
+    assert [act["description"] for act in acts] == [
+        "Deposit: EFT from funding1 12",
+        "Deposit: EFT from funding1 12",
+        "Deposit: EFT from f2 12",
+    ]
+    assert "prefetch" in api._thread_pools
+
+
+def test_format_activities_skips_prefetch_when_not_needed(api):
+    """Test no threads are used for cached, local-only, or single lookups."""
+    api._lookup_cache[("FetchFundsTransfer", "funding1")] = _fake_funding("Bank")
+    acts = [
+        {"type": "DIVIDEND", "subType": None, "securityId": "sec1"},
+        {"type": "DIVIDEND", "subType": None, "securityId": "sec2"},
+        _eft_deposit("funding1"),
+        _eft_deposit("funding2"),
+    ]
+    with patch.object(api, "do_graphql_query", return_value=_fake_funding("Other")):
+        api.format_activities(acts)
+
+    assert not api._thread_pools
+    assert [act["description"] for act in acts] == [
+        "Dividend: [sec1]",
+        "Dividend: [sec2]",
+        "Deposit: EFT from Bank 12",
+        "Deposit: EFT from Other 12",
+    ]
+
+
+def test_format_activities_failed_prefetch_is_retried(api):
+    """Test lookups that fail while prefetching are retried when formatting."""
+    acts = [_eft_deposit("funding1"), _eft_deposit("funding2")]
+    failed = set()
+
+    def get_etf_details(key):
+        if key == "funding1" and key not in failed:
+            failed.add(key)
+            raise WSApiException("")
+        return _fake_funding(key)
+
+    with patch.object(api, "get_etf_details", side_effect=get_etf_details):
+        api.format_activities(acts)
+
+    assert [act["description"] for act in acts] == [
+        "Deposit: EFT from funding1 12",
+        "Deposit: EFT from funding2 12",
+    ]
+
+
+def test_format_activities_batches_market_data(api):
+    """Test format_activities fetches the market data of all securities at once."""
+    acts = [
+        {"type": "DIVIDEND", "subType": None, "securityId": "sec1"},
+        {"type": "DIY_BUY", "subType": "MARKET_ORDER", "securityId": "sec2"},
+        {"type": "DIVIDEND", "subType": None, "securityId": "sec2"},
+    ]
+    acts[1].update(assetQuantity="2", amount="10")
+    cache = {}
+    api.security_market_data_cache_getter = cache.get
+    api.security_market_data_cache_setter = lambda sid, value: cache.setdefault(
+        sid, value
+    )
+    response = {
+        "data": {
+            "s0": {"stock": {"primaryExchange": "TSX", "symbol": "AAA"}},
+            "s1": {"stock": {"primaryExchange": "NYSE", "symbol": "BBB"}},
+        }
+    }
+    with patch.object(api, "send_post", return_value=response) as mock_post:
+        api.format_activities(acts)
+
+    mock_post.assert_called_once()
+    assert mock_post.call_args.args[1]["variables"] == {"id0": "sec1", "id1": "sec2"}
+    assert set(cache) == {"sec1", "sec2"}
+    assert [act["description"] for act in acts] == [
+        "Dividend: TSX:AAA",
+        "Market order: buy 2.0 x NYSE:BBB @ 5.0",
+        "Dividend: NYSE:BBB",
+    ]
+
+
+def test_gather(api):
+    """Test gather runs calls concurrently and returns their results in order."""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow():
+        barrier.wait()
+        time.sleep(0.05)
+        return "slow"
+
+    def fast():
+        barrier.wait()
+        return "fast"
+
+    assert api.gather(slow, fast) == ["slow", "fast"]
+
+    def fail():
+        raise WSApiException("failed")
+
+    with pytest.raises(WSApiException):
+        api.gather(lambda: "ok", fail)
+
+    api.close()
+    assert not api._thread_pools
+
+
+def test_format_activities_uses_batched_market_data_without_cache(api):
+    """Test batched market data is used while formatting, even if not cached."""
+    act = {
+        "type": "CORPORATE_ACTION",
+        "subType": "SUBDIVISION",
+        "canonicalId": "ca1",
+        "securityId": "sec1",
+        "assetSymbol": "AAA",
+        "amount": "2",
+        "currency": None,
+    }
+    response = {"data": {"s0": {"fundamentals": {"currency": "CAD"}}}}
+    with (
+        patch.object(api, "send_post", return_value=response) as mock_post,
+        patch.object(api, "get_corporate_action_child_activities", return_value=[]),
+    ):
+        api.format_activities([act])
+
+    mock_post.assert_called_once()
+    assert act["currency"] == "CAD"
+
+
+def test_gather_nested(api):
+    """Test calls of gather() can use gather() without waiting for a free thread."""
+    api.PREFETCH_MAX_WORKERS = 1
+    result = api.gather(lambda: api.gather(lambda: "inner", lambda: "other"))
+    assert result == [["inner", "other"]]
+    api.close()
+
+
+def test_thread_pool_created_once(api):
+    """Test concurrent callers share a single thread pool."""
+    barrier = threading.Barrier(4, timeout=5)
+    pools = []
+
+    def get_pool():
+        barrier.wait()
+        pools.append(api._thread_pool("prefetch"))
+
+    threads = [threading.Thread(target=get_pool) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(pool) for pool in pools}) == 1
+    api.close()
+
+
 def test_security_id_to_symbol_no_cache(api):
     """Test security_id_to_symbol without cache, exception path."""
     with patch.object(api, "get_security_market_data", side_effect=WSApiException("")):
@@ -285,6 +1114,48 @@ def test_get_transfer_details(api):
         assert result == fake
 
 
+def test_lookups_are_cached(api):
+    """Test ID-keyed lookups are only queried once per ID."""
+    fake = {"id": "trans1"}
+    with patch.object(api, "do_graphql_query", return_value=fake) as mock_query:
+        assert api.get_transfer_details("trans_id") == fake
+        assert api.get_transfer_details("trans_id") == fake
+        assert mock_query.call_count == 1
+
+
+def test_lookup_cache_is_bounded(api):
+    """Test the lookup cache forgets the least recently used results."""
+    api._lookup_cache.maxsize = 2
+    with patch.object(api, "do_graphql_query", side_effect=lambda *args: args[1]):
+        api.get_transfer_details("t1")
+        api.get_transfer_details("t2")
+        api.get_transfer_details("t1")
+        api.get_transfer_details("t3")
+
+    assert list(api._lookup_cache) == [
+        ("FetchInstitutionalTransfer", "t1"),
+        ("FetchInstitutionalTransfer", "t3"),
+    ]
+
+
+def test_security_market_data_not_memoized(api):
+    """Test market data is only cached by the caller's cache, which is read first."""
+    fake = {"id": "sec1"}
+    with patch.object(api, "do_graphql_query", return_value=fake) as mock_query:
+        assert api.get_security_market_data("sec1") == fake
+        assert api.get_security_market_data("sec1") == fake
+        assert mock_query.call_count == 2
+
+        cache = {"sec1": {"id": "cached"}}
+        api.security_market_data_cache_getter = cache.get
+        api.security_market_data_cache_setter = lambda sid, value: value
+        assert api.get_security_market_data("sec1") == {"id": "cached"}
+        assert mock_query.call_count == 2
+
+        api.get_security_market_data("sec1", use_cache=False)
+        assert mock_query.call_count == 3
+
+
 def test_get_security_market_data(api):
     """Smoke test get_security_market_data without cache."""
     fake = {"stock": {"symbol": "TEST"}}
@@ -293,6 +1164,28 @@ def test_get_security_market_data(api):
         assert result == fake
 
 
+def test_get_securities_market_data_single_aliased_query(api):
+    """Test get_securities_market_data fetches uncached securities in one query."""
+    cache = {"sec1": {"id": "sec1"}}
+    api.security_market_data_cache_getter = cache.get
+    api.security_market_data_cache_setter = lambda sid, value: cache.setdefault(
+        sid, value
+    )
+    response = {"data": {"s0": {"id": "sec2"}, "s1": None}}
+    with patch.object(api, "send_post", return_value=response) as mock_post:
+        result = api.get_securities_market_data(["sec1", "sec2", "sec3", "sec2"])
+
+        mock_post.assert_called_once()
+        query = mock_post.call_args.args[1]
+        assert query["operationName"] == "FetchSecuritiesMarketData"
+        assert query["variables"] == {"id0": "sec2", "id1": "sec3"}
+        assert "s1:security(id:$id1)" in query["query"]
+        assert "fragment SecurityMarketData on Security" in query["query"]
+
+    assert result == {"sec1": {"id": "sec1"}, "sec2": {"id": "sec2"}}
+    assert cache["sec2"] == {"id": "sec2"}
+
+
 def test_get_security_historical_quotes(api):
     """Smoke test get_security_historical_quotes."""
     fake = [{"date": "2023-01-01"}]
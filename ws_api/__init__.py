@@ -8,6 +8,7 @@ from ws_api.exceptions import (
 )
 from ws_api.session import WSAPISession
 from ws_api.wealthsimple_api import WealthsimpleAPI
+from ws_api.wealthsimple_api_async import WealthsimpleAPIAsync
 
 __version__ = "0.32.2"
 
@@ -20,5 +21,6 @@ __all__ = [
     "WSApiException",
     "WSAPISession",
     "WealthsimpleAPI",
+    "WealthsimpleAPIAsync",
     "__version__",
 ]
@@ -0,0 +1,26 @@
+"""JSON (de)serialization helpers, backed by orjson when it is installed."""
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed extras
+    orjson = None
+
+if orjson is not None:
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: bytes | str):
+        return orjson.loads(data)
+
+else:  # pragma: no cover - depends on the installed extras
+    import json
+
+    JSONDecodeError = json.JSONDecodeError
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(data: bytes | str):
+        return json.loads(data)
@@ -23,12 +23,9 @@ class WSApiException(Exception):
         :param code: The error code.
         :param response: Optional response data associated with the exception.
         """
-        super().__init__(message)
+        super().__init__(f"{message}; Response: {response}")
         self.response = response
 
-    def __str__(self):
-        return f"{super().__str__()}; Response: {self.response}"
-
 
 class LoginFailedException(WSApiException):
     pass
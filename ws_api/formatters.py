@@ -1,5 +1,8 @@
 """Formatting functions for human-readable descriptions."""
 
+import sys
+from types import MappingProxyType
+
 # Mapping of account types to human-readable descriptions
 _ACCOUNT_TYPE_DESCRIPTIONS = {
     "SELF_DIRECTED_RRSP": "RRSP: self-directed",
@@ -23,6 +26,13 @@ _ACCOUNT_TYPE_DESCRIPTIONS = {
     "MANAGED_FIXED_INCOME_NON_REGISTERED": "Income Portfolio: managed",
     "PORTFOLIO_LINE_OF_CREDIT": "Portfolio line of credit",
 }
+# Read-only, with interned keys so lookups with interned account types compare by identity
+_ACCOUNT_TYPE_DESCRIPTIONS = MappingProxyType(
+    {sys.intern(k): v for k, v in _ACCOUNT_TYPE_DESCRIPTIONS.items()}
+)
+
+# Custodian account branches whose account number is the one shown in the WS app
+_WS_TR_BRANCHES = frozenset(("WS", "TR"))
 
 
 def format_account_description(account: dict) -> None:
@@ -32,16 +42,19 @@ def format_account_description(account: dict) -> None:
         account: Account dictionary to modify in place.
     """
     account["number"] = account["id"]
-    # This is the account number visible in the WS app:
-    for ca in account["custodianAccounts"]:
-        if ca["branch"] in ("WS", "TR") and ca["status"] == "open":
+    # This is the account number visible in the WS app (the last open WS/TR one):
+    for ca in reversed(account["custodianAccounts"]):
+        if ca["status"] == "open" and ca["branch"] in _WS_TR_BRANCHES:
             account["number"] = ca["id"]
+            break
 
     if account.get("nickname"):
         account["description"] = account["nickname"]
         return
 
     account_type = account["unifiedAccountType"]
+    if account_type:
+        account_type = account["unifiedAccountType"] = sys.intern(account_type)
 
     # Special case: CASH depends on owner configuration
     if account_type == "CASH":
@@ -52,12 +65,12 @@ def format_account_description(account: dict) -> None:
         )
     # Special case: MANAGED_NON_REGISTERED depends on features
     elif account_type == "MANAGED_NON_REGISTERED":
-        features = {f["name"] for f in account["accountFeatures"]}
-        if "PRIVATE_CREDIT" in features:
+        features = account["accountFeatures"]
+        if any(f["name"] == "PRIVATE_CREDIT" for f in features):
             account["description"] = "Non-registered: managed - private credit"
-        elif "PRIVATE_EQUITY" in features:
+        elif any(f["name"] == "PRIVATE_EQUITY" for f in features):
             account["description"] = "Non-registered: managed - private equity"
-        elif "MANAGED" in features:
+        elif any(f["name"] == "MANAGED" for f in features):
             account["description"] = "Non-registered: managed"
         else:
             account["description"] = account_type
@@ -81,17 +94,16 @@ def _format_institutional_transfer(act: dict, api_context) -> bool:
     if act["type"] != "INSTITUTIONAL_TRANSFER_INTENT":
         return False
 
-    if act["subType"] == "TRANSFER_IN":
+    sub_type = act["subType"]
+    if sub_type == "TRANSFER_IN":
         details = api_context.get_transfer_details(act["externalCanonicalId"])
-        verb = ""
-        client_account_type = ""
-        institution_name = ""
-        redacted_account_number = ""
-        if isinstance(details, dict):
+        try:
             verb = details["transferType"].replace("_", "-").capitalize()
             client_account_type = details["clientAccountType"].upper()
             institution_name = details["institutionName"]
             redacted_account_number = details["redactedInstitutionAccountNumber"]
+        except (TypeError, KeyError):
+            verb = client_account_type = institution_name = redacted_account_number = ""
         act["description"] = (
             f"Institutional transfer: {verb} {client_account_type} "
             f"account transfer from {institution_name} "
@@ -99,7 +111,7 @@ def _format_institutional_transfer(act: dict, api_context) -> bool:
         )
         return True
 
-    if act["subType"] == "TRANSFER_OUT":
+    if sub_type == "TRANSFER_OUT":
         act["description"] = (
             f"Institutional transfer: transfer to {act['institutionName']}"
         )
@@ -124,22 +136,15 @@ def _format_corporate_action_subdivision(act: dict, api_context) -> bool:
     child_activities = api_context.get_corporate_action_child_activities(
         act["canonicalId"]
     )
-    held_activity = next(
-        (
-            activity
-            for activity in child_activities
-            if activity["entitlementType"] == "HOLD"
-        ),
-        None,
-    )
-    receive_activity = next(
-        (
-            activity
-            for activity in child_activities
-            if activity["entitlementType"] == "RECEIVE"
-        ),
-        None,
-    )
+    held_activity = receive_activity = None
+    for activity in child_activities:
+        entitlement_type = activity["entitlementType"]
+        if entitlement_type == "HOLD" and held_activity is None:
+            held_activity = activity
+        elif entitlement_type == "RECEIVE" and receive_activity is None:
+            receive_activity = activity
+        if held_activity and receive_activity:
+            break
     if held_activity and receive_activity:
         held_shares: float = float(held_activity["quantity"])
         received_shares: float = float(receive_activity["quantity"])
@@ -163,41 +168,41 @@ def _format_corporate_action_subdivision(act: dict, api_context) -> bool:
     return True
 
 
-def _format_credit_card_description(act: dict) -> bool:
+# (type, subType) -> (label, pending_aware, with_merchant); a None subType
+# matches any subType of that activity type.
+_CREDIT_CARD_DISPATCH = {
+    # Posted purchase transactions have status = settled
+    ("CREDIT_CARD", "PURCHASE"): ("Credit card purchase", True, True),
+    # Posted return transactions have subType = REFUND and status = settled
+    ("CREDIT_CARD", "HOLD"): ("Credit card refund", True, True),
+    ("CREDIT_CARD", "REFUND"): ("Credit card refund", False, True),
+    ("CREDIT_CARD", "PAYMENT"): ("Credit card payment", False, False),
+    ("CREDIT_CARD_PAYMENT", None): ("Credit card payment", False, False),
+}
+
+
+def _format_credit_card_description(act: dict, api_context=None) -> bool:
     """Format description for credit card activities.
 
     Args:
         act: Activity dictionary to modify in place.
+        api_context: Unused; accepted for consistency with the other formatters.
 
     Returns:
         True if this was a credit card activity and was handled, False otherwise.
     """
-    if act["type"] == "CREDIT_CARD" and act["subType"] == "PURCHASE":
-        merchant = act["spendMerchant"]
-        # Posted purchase transactions have status = settled
-        status = "(Pending) " if act["status"] == "authorized" else ""
-        act["description"] = f"{status}Credit card purchase: {merchant}"
-        return True
-
-    if act["type"] == "CREDIT_CARD" and act["subType"] == "HOLD":
-        merchant = act["spendMerchant"]
-        # Posted return transactions have subType = REFUND and status = settled
-        status = "(Pending) " if act["status"] == "authorized" else ""
-        act["description"] = f"{status}Credit card refund: {merchant}"
-        return True
-
-    if act["type"] == "CREDIT_CARD" and act["subType"] == "REFUND":
-        merchant = act["spendMerchant"]
-        act["description"] = f"Credit card refund: {merchant}"
-        return True
-
-    if (act["type"] == "CREDIT_CARD" and act["subType"] == "PAYMENT") or act[
-        "type"
-    ] == "CREDIT_CARD_PAYMENT":
-        act["description"] = "Credit card payment"
-        return True
+    type_ = act["type"]
+    entry = _CREDIT_CARD_DISPATCH.get(
+        (type_, act["subType"])
+    ) or _CREDIT_CARD_DISPATCH.get((type_, None))
+    if entry is None:
+        return False
 
-    return False
+    label, pending_aware, with_merchant = entry
+    status = "(Pending) " if pending_aware and act["status"] == "authorized" else ""
+    merchant = f": {act['spendMerchant']}" if with_merchant else ""
+    act["description"] = f"{status}{label}{merchant}"
+    return True
 
 
 def _format_internal_transfer(act: dict, api_context) -> bool:
@@ -205,13 +210,20 @@ def _format_internal_transfer(act: dict, api_context) -> bool:
     if act["type"] not in ("INTERNAL_TRANSFER", "ASSET_MOVEMENT"):
         return False
 
-    accounts = api_context.get_accounts(False)
-    matching = [acc for acc in accounts if acc["id"] == act["opposingAccountId"]]
-    target_account = matching.pop() if matching else None
+    account_id = act["opposingAccountId"]
+    get_account_by_id = getattr(api_context, "get_account_by_id", None)
+    if get_account_by_id is not None:
+        target_account = get_account_by_id(account_id)
+    else:
+        # API contexts that only provide get_accounts()
+        accounts = api_context.get_accounts(False)
+        target_account = next(
+            (acc for acc in accounts if acc["id"] == account_id), None
+        )
     account_description = (
         f"{target_account['description']} ({target_account['number']})"
         if target_account
-        else act["opposingAccountId"]
+        else account_id
     )
     direction = "to" if act["subType"] == "SOURCE" else "from"
     act["description"] = (
@@ -222,7 +234,8 @@ def _format_internal_transfer(act: dict, api_context) -> bool:
 
 def _format_trade(act: dict, api_context) -> bool:
     """Format description for trade activities."""
-    if act["type"] not in (
+    type_ = act["type"]
+    if type_ not in (
         "DIY_BUY",
         "DIY_SELL",
         "MANAGED_BUY",
@@ -232,21 +245,21 @@ def _format_trade(act: dict, api_context) -> bool:
     ):
         return False
 
-    if "MANAGED" in act["type"]:
+    if "MANAGED" in type_:
         verb = "Managed transaction"
     else:
         verb = act["subType"].replace("_", " ").capitalize()
-        if "CRYPTO" in act["type"]:
+        if "CRYPTO" in type_:
             verb = f"Crypto {verb}"
-    action = "buy" if "_BUY" in act["type"] else "sell"
+    action = "buy" if "_BUY" in type_ else "sell"
     security = api_context.security_id_to_symbol(act["securityId"])
-    if act["assetQuantity"] is None:
+    quantity = act["assetQuantity"]
+    if quantity is None:
         act["description"] = f"{verb}: {action} TBD"
     else:
-        act["description"] = (
-            f"{verb}: {action} {float(act['assetQuantity'])} x "
-            f"{security} @ {float(act['amount']) / float(act['assetQuantity'])}"
-        )
+        quantity = float(quantity)
+        price = float(act["amount"]) / quantity
+        act["description"] = f"{verb}: {action} {quantity} x {security} @ {price}"
     return True
 
 
@@ -256,168 +269,338 @@ def _format_eft(act: dict, api_context) -> bool:
         return False
 
     details = api_context.get_etf_details(act["externalCanonicalId"])
+    is_deposit = act["type"] == "DEPOSIT"
     type_ = act["type"].lower().capitalize()
-    direction = "from" if act["type"] == "DEPOSIT" else "to"
-    prop = "source" if act["type"] == "DEPOSIT" else "destination"
-    bank_account_info = {}
-    if isinstance(details, dict):
-        bank_account_info = details.get(prop, {})
-    bank_account = {}
-    if isinstance(bank_account_info, dict):
-        bank_account = bank_account_info.get("bankAccount", {})
-    nickname = bank_account.get("nickname")
-    account_number = bank_account.get("accountNumber")
-    if not nickname:
-        nickname = bank_account.get("accountName")
+    direction = "from" if is_deposit else "to"
+    prop = "source" if is_deposit else "destination"
+    try:
+        bank_account = details[prop]["bankAccount"]
+        nickname = bank_account.get("nickname") or bank_account.get("accountName")
+        account_number = bank_account.get("accountNumber")
+    except (TypeError, KeyError, AttributeError):
+        nickname, account_number = None, None
     act["description"] = f"{type_}: EFT {direction} {nickname} {account_number}"
     return True
 
 
-def format_activity_description(act: dict, api_context) -> None:
-    """Add human-readable description to an activity dict.
+def _format_legacy_internal_transfer(act: dict, api_context) -> None:
+    """Format description for legacy internal transfer activities."""
+    act["description"] = (
+        "Transfer in" if act["subType"] == "DESTINATION" else "Transfer out"
+    )
 
-    Args:
-        act: Activity dictionary to modify in place.
-        api_context: API context object providing methods like:
-            - get_accounts(open_only: bool)
-            - security_id_to_symbol(security_id: str)
-            - get_corporate_action_child_activities(activity_canonical_id: str)
-            - get_security_market_data(security_id: str)
-            - get_etf_details(funding_id: str)
-            - get_transfer_details(transfer_id: str)
-    """
-    act["description"] = f"{act['type']}: {act['subType']}"
-
-    if (
-        _format_corporate_action_subdivision(act, api_context)
-        or _format_institutional_transfer(act, api_context)
-        or _format_credit_card_description(act)
-        or _format_internal_transfer(act, api_context)
-        or _format_trade(act, api_context)
-        or _format_eft(act, api_context)
-    ):
-        pass  # Handled by helper function
 
-    elif act["type"] == "LEGACY_INTERNAL_TRANSFER":
-        act["description"] = (
-            "Transfer in" if act["subType"] == "DESTINATION" else "Transfer out"
-        )
+def _format_crypto_staking(act: dict, api_context) -> None:
+    """Format description for crypto staking activities."""
+    action = "stake" if act["subType"] == "STAKE" else "unstake"
+    security = api_context.security_id_to_symbol(act["securityId"])
+    act["description"] = f"Crypto {action}: {float(act['assetQuantity'])} x {security}"
 
-    elif act["type"] == "CRYPTO_STAKING_ACTION":
-        action = "stake" if act["subType"] == "STAKE" else "unstake"
-        security = api_context.security_id_to_symbol(act["securityId"])
-        act["description"] = (
-            f"Crypto {action}: {float(act['assetQuantity'])} x {security}"
-        )
 
-    elif act["type"] == "CRYPTO_TRANSFER":
-        action = "sent" if act["subType"] == "TRANSFER_OUT" else "received"
-        security = api_context.security_id_to_symbol(act["securityId"])
-        act["description"] = (
-            f"Crypto {action}: {float(act['assetQuantity'])} x {security}"
-        )
+def _format_crypto_transfer(act: dict, api_context) -> None:
+    """Format description for crypto transfer activities."""
+    action = "sent" if act["subType"] == "TRANSFER_OUT" else "received"
+    security = api_context.security_id_to_symbol(act["securityId"])
+    act["description"] = f"Crypto {action}: {float(act['assetQuantity'])} x {security}"
 
-    elif act["type"] in ["DEPOSIT", "WITHDRAWAL"] and act["subType"] in [
-        "E_TRANSFER",
-        "E_TRANSFER_FUNDING",
-    ]:
-        direction = "from" if act["type"] == "DEPOSIT" else "to"
-        act["description"] = (
-            f"Deposit: Interac e-transfer {direction} {act['eTransferName']} {act['eTransferEmail']}"
-        )
 
-    elif act["type"] == "DEPOSIT" and act["subType"] == "PAYMENT_CARD_TRANSACTION":
-        type_ = act["type"].lower().capitalize()
-        act["description"] = f"{type_}: Debit card funding"
+def _format_e_transfer(act: dict, api_context) -> None:
+    """Format description for Interac e-transfer activities."""
+    direction = "from" if act["type"] == "DEPOSIT" else "to"
+    act["description"] = (
+        f"Deposit: Interac e-transfer {direction} {act['eTransferName']} {act['eTransferEmail']}"
+    )
 
-    elif act["type"] == "REFUND" and act["subType"] == "TRANSFER_FEE_REFUND":
-        act["description"] = "Reimbursement: account transfer fee"
 
-    elif act["type"] == "REFUND":
-        act["description"] = "Refund"
+def _format_debit_card_funding(act: dict, api_context) -> None:
+    """Format description for debit card funding activities."""
+    type_ = act["type"].lower().capitalize()
+    act["description"] = f"{type_}: Debit card funding"
 
-    elif act["type"] == "INTEREST":
-        if act["subType"] == "FPL_INTEREST":
-            act["description"] = "Stock Lending Earnings"
-        else:
-            act["description"] = "Interest"
 
-    elif act["type"] == "DIVIDEND":
-        security = api_context.security_id_to_symbol(act["securityId"])
-        act["description"] = f"Dividend: {security}"
+def _format_transfer_fee_refund(act: dict, api_context) -> None:
+    """Format description for transfer fee refund activities."""
+    act["description"] = "Reimbursement: account transfer fee"
 
-    elif act["type"] == "FUNDS_CONVERSION":
-        act["description"] = (
-            f"Funds converted: {act['currency']} from {'USD' if act['currency'] == 'CAD' else 'CAD'}"
-        )
 
-    elif act["type"] == "NON_RESIDENT_TAX":
-        act["description"] = "Non-resident tax"
-
-    # Refs:
-    #   https://www.payments.ca/payment-resources/iso-20022/automatic-funds-transfer
-    #   https://www.payments.ca/compelling-new-evidence-strong-link-between-aft-and-canadas-cheque-decline
-    # 2nd ref states: "AFTs are electronic direct credit or direct debit transactions, commonly known in Canada as direct deposits or pre-authorized debits (PADs)."
-    elif act["type"] in ("DEPOSIT", "WITHDRAWAL") and act["subType"] == "AFT":
-        type_ = "Direct deposit" if act["type"] == "DEPOSIT" else "Pre-authorized debit"
-        direction = "from" if type_ == "Direct deposit" else "to"
-        institution = (
-            act["aftOriginatorName"]
-            if act["aftOriginatorName"]
-            else act["externalCanonicalId"]
-        )
-        act["description"] = f"{type_}: {direction} {institution}"
-
-    elif act["type"] == "WITHDRAWAL" and act["subType"] == "BILL_PAY":
-        type_ = act["type"].capitalize()
-        name = act["billPayPayeeNickname"]
-        if not name:
-            name = act["billPayCompanyName"]
-        number = act["redactedExternalAccountNumber"]
-        act["description"] = f"{type_}: Bill pay {name} {number}"
-
-    elif act["type"] == "P2P_PAYMENT" and act["subType"] in (
-        "SEND",
-        "SEND_RECEIVED",
-    ):
-        direction = "sent to" if act["subType"] == "SEND" else "received from"
-        p2p_handle = act["p2pHandle"]
-        act["description"] = f"Cash {direction} {p2p_handle}"
-
-    elif act["type"] == "PROMOTION" and act["subType"] == "INCENTIVE_BONUS":
-        type_ = act["type"].capitalize()
-        subtype = act["subType"].replace("_", " ").capitalize()
-        act["description"] = f"{type_}: {subtype}"
-
-    elif act["type"] == "REFERRAL" and act["subType"] is None:
-        type_ = act["type"].capitalize()
-        act["description"] = f"{type_}"
-
-    elif act["type"] == "REIMBURSEMENT" and act["subType"] == "CASHBACK":
-        program = (
-            "- Visa Infinite"
-            if act["rewardProgram"] == "CREDIT_CARD_VISA_INFINITE_REWARDS"
-            else ""
-        )
-        act["description"] = f"Cash back {program}".rstrip()
+def _format_refund(act: dict, api_context) -> None:
+    """Format description for refund activities."""
+    act["description"] = "Refund"
 
-    elif act["type"] == "REIMBURSEMENT" and act["subType"] == "ETF_REBATE":
-        act["description"] = "Reimbursement: Exchange-traded fund rebate"
 
-    elif act["type"] == "REIMBURSEMENT" and act["subType"] == "REWARD":
-        act["description"] = "Reimbursement: Reward"
+def _format_interest(act: dict, api_context) -> None:
+    """Format description for interest activities."""
+    if act["subType"] == "FPL_INTEREST":
+        act["description"] = "Stock Lending Earnings"
+    else:
+        act["description"] = "Interest"
 
-    elif act["type"] == "SPEND" and act["subType"] == "PREPAID":
-        merchant = act["spendMerchant"]
-        act["description"] = f"Purchase: {merchant}"
 
-    elif act["type"] == "INTEREST_CHARGE":
-        if act["subType"] == "MARGIN_INTEREST":
-            act["description"] = "Interest Charge: margin interest"
-        else:
-            act["description"] = "Interest Charge"
+def _format_dividend(act: dict, api_context) -> None:
+    """Format description for dividend activities."""
+    security = api_context.security_id_to_symbol(act["securityId"])
+    act["description"] = f"Dividend: {security}"
+
+
+def _format_funds_conversion(act: dict, api_context) -> None:
+    """Format description for funds conversion activities."""
+    act["description"] = (
+        f"Funds converted: {act['currency']} from {'USD' if act['currency'] == 'CAD' else 'CAD'}"
+    )
+
+
+def _format_non_resident_tax(act: dict, api_context) -> None:
+    """Format description for non-resident tax activities."""
+    act["description"] = "Non-resident tax"
+
+
+# Refs:
+#   https://www.payments.ca/payment-resources/iso-20022/automatic-funds-transfer
+#   https://www.payments.ca/compelling-new-evidence-strong-link-between-aft-and-canadas-cheque-decline
+# 2nd ref states: "AFTs are electronic direct credit or direct debit transactions, commonly known in Canada as direct deposits or pre-authorized debits (PADs)."
+def _format_aft(act: dict, api_context) -> None:
+    """Format description for automated funds transfer (AFT) activities."""
+    type_ = "Direct deposit" if act["type"] == "DEPOSIT" else "Pre-authorized debit"
+    direction = "from" if type_ == "Direct deposit" else "to"
+    institution = (
+        act["aftOriginatorName"]
+        if act["aftOriginatorName"]
+        else act["externalCanonicalId"]
+    )
+    act["description"] = f"{type_}: {direction} {institution}"
+
+
+def _format_bill_pay(act: dict, api_context) -> None:
+    """Format description for bill payment activities."""
+    type_ = act["type"].capitalize()
+    name = act["billPayPayeeNickname"]
+    if not name:
+        name = act["billPayCompanyName"]
+    number = act["redactedExternalAccountNumber"]
+    act["description"] = f"{type_}: Bill pay {name} {number}"
+
+
+def _format_p2p_payment(act: dict, api_context) -> None:
+    """Format description for peer-to-peer payment activities."""
+    direction = "sent to" if act["subType"] == "SEND" else "received from"
+    p2p_handle = act["p2pHandle"]
+    act["description"] = f"Cash {direction} {p2p_handle}"
+
+
+def _format_promotion(act: dict, api_context) -> None:
+    """Format description for promotion activities."""
+    type_ = act["type"].capitalize()
+    subtype = act["subType"].replace("_", " ").capitalize()
+    act["description"] = f"{type_}: {subtype}"
+
+
+def _format_referral(act: dict, api_context) -> None:
+    """Format description for referral activities."""
+    type_ = act["type"].capitalize()
+    act["description"] = f"{type_}"
+
+
+def _format_cashback(act: dict, api_context) -> None:
+    """Format description for cash back activities."""
+    program = (
+        "- Visa Infinite"
+        if act["rewardProgram"] == "CREDIT_CARD_VISA_INFINITE_REWARDS"
+        else ""
+    )
+    act["description"] = f"Cash back {program}".rstrip()
+
+
+def _format_etf_rebate(act: dict, api_context) -> None:
+    """Format description for ETF rebate activities."""
+    act["description"] = "Reimbursement: Exchange-traded fund rebate"
+
+
+def _format_reward(act: dict, api_context) -> None:
+    """Format description for reward activities."""
+    act["description"] = "Reimbursement: Reward"
+
+
+def _format_prepaid_spend(act: dict, api_context) -> None:
+    """Format description for prepaid spend activities."""
+    merchant = act["spendMerchant"]
+    act["description"] = f"Purchase: {merchant}"
+
+
+def _format_interest_charge(act: dict, api_context) -> None:
+    """Format description for interest charge activities."""
+    if act["subType"] == "MARGIN_INTEREST":
+        act["description"] = "Interest Charge: margin interest"
+    else:
+        act["description"] = "Interest Charge"
+
+
+def _format_management_fee(act: dict, api_context) -> None:
+    """Format description for management fee activities."""
+    act["description"] = "Management fee"
+
+
+# Wildcard used in _ACTIVITY_DISPATCH keys to match any type or subType
+_ANY = "*"
+
+_TRADE_TYPES = (
+    "DIY_BUY",
+    "DIY_SELL",
+    "MANAGED_BUY",
+    "MANAGED_SELL",
+    "CRYPTO_BUY",
+    "CRYPTO_SELL",
+)
+
+# Mapping of (type, subType) to the function formatting the activity description.
+# Lookups try the exact key first, then (_ANY, subType), then (type, _ANY).
+_ACTIVITY_DISPATCH = {
+    ("CORPORATE_ACTION", "SUBDIVISION"): _format_corporate_action_subdivision,
+    ("INSTITUTIONAL_TRANSFER_INTENT", "TRANSFER_IN"): _format_institutional_transfer,
+    ("INSTITUTIONAL_TRANSFER_INTENT", "TRANSFER_OUT"): _format_institutional_transfer,
+    ("CREDIT_CARD", "PURCHASE"): _format_credit_card_description,
+    ("CREDIT_CARD", "HOLD"): _format_credit_card_description,
+    ("CREDIT_CARD", "REFUND"): _format_credit_card_description,
+    ("CREDIT_CARD", "PAYMENT"): _format_credit_card_description,
+    ("CREDIT_CARD_PAYMENT", _ANY): _format_credit_card_description,
+    ("INTERNAL_TRANSFER", _ANY): _format_internal_transfer,
+    ("ASSET_MOVEMENT", _ANY): _format_internal_transfer,
+    **{(type_, _ANY): _format_trade for type_ in _TRADE_TYPES},
+    (_ANY, "EFT"): _format_eft,
+    ("LEGACY_INTERNAL_TRANSFER", _ANY): _format_legacy_internal_transfer,
+    ("CRYPTO_STAKING_ACTION", _ANY): _format_crypto_staking,
+    ("CRYPTO_TRANSFER", _ANY): _format_crypto_transfer,
+    ("DEPOSIT", "E_TRANSFER"): _format_e_transfer,
+    ("DEPOSIT", "E_TRANSFER_FUNDING"): _format_e_transfer,
+    ("WITHDRAWAL", "E_TRANSFER"): _format_e_transfer,
+    ("WITHDRAWAL", "E_TRANSFER_FUNDING"): _format_e_transfer,
+    ("DEPOSIT", "PAYMENT_CARD_TRANSACTION"): _format_debit_card_funding,
+    ("REFUND", "TRANSFER_FEE_REFUND"): _format_transfer_fee_refund,
+    ("REFUND", _ANY): _format_refund,
+    ("INTEREST", _ANY): _format_interest,
+    ("DIVIDEND", _ANY): _format_dividend,
+    ("FUNDS_CONVERSION", _ANY): _format_funds_conversion,
+    ("NON_RESIDENT_TAX", _ANY): _format_non_resident_tax,
+    ("DEPOSIT", "AFT"): _format_aft,
+    ("WITHDRAWAL", "AFT"): _format_aft,
+    ("WITHDRAWAL", "BILL_PAY"): _format_bill_pay,
+    ("P2P_PAYMENT", "SEND"): _format_p2p_payment,
+    ("P2P_PAYMENT", "SEND_RECEIVED"): _format_p2p_payment,
+    ("PROMOTION", "INCENTIVE_BONUS"): _format_promotion,
+    ("REFERRAL", None): _format_referral,
+    ("REIMBURSEMENT", "CASHBACK"): _format_cashback,
+    ("REIMBURSEMENT", "ETF_REBATE"): _format_etf_rebate,
+    ("REIMBURSEMENT", "REWARD"): _format_reward,
+    ("SPEND", "PREPAID"): _format_prepaid_spend,
+    ("INTEREST_CHARGE", _ANY): _format_interest_charge,
+    ("FEE", "MANAGEMENT_FEE"): _format_management_fee,
+}
+
+# Types that take precedence over EFT formatting, whatever their subType
+for _type in (
+    "CREDIT_CARD_PAYMENT",
+    "INTERNAL_TRANSFER",
+    "ASSET_MOVEMENT",
+    *_TRADE_TYPES,
+):
+    _ACTIVITY_DISPATCH[(_type, "EFT")] = _ACTIVITY_DISPATCH[(_type, _ANY)]
+
+
+def _get_activity_formatter(type_: str, sub_type: str | None):
+    return (
+        _ACTIVITY_DISPATCH.get((type_, sub_type))
+        or _ACTIVITY_DISPATCH.get((_ANY, sub_type))
+        or _ACTIVITY_DISPATCH.get((type_, _ANY))
+    )
+
+
+_SECURITY_SYMBOL_FORMATTERS = (
+    _format_trade,
+    _format_crypto_staking,
+    _format_crypto_transfer,
+    _format_dividend,
+)
+
+
+def collect_activity_lookups(acts: list[dict]) -> dict[str, set[str]]:
+    """List the API lookups needed to format the descriptions of some activities.
+
+    Args:
+        acts: Activity dictionaries.
+
+    Returns:
+        A dict mapping the name of an API context method (e.g. get_etf_details) to
+        the set of IDs it will be called with by format_activity_description().
+    """
+    lookups = {
+        "security_id_to_symbol": set(),
+        "get_etf_details": set(),
+        "get_transfer_details": set(),
+        "get_corporate_action_child_activities": set(),
+        "get_security_market_data": set(),
+    }
+    for act in acts:
+        formatter = _get_activity_formatter(act["type"], act["subType"])
+        if formatter in _SECURITY_SYMBOL_FORMATTERS:
+            lookups["security_id_to_symbol"].add(act["securityId"])
+        elif formatter is _format_eft:
+            lookups["get_etf_details"].add(act["externalCanonicalId"])
+        elif (
+            formatter is _format_institutional_transfer
+            and act["subType"] == "TRANSFER_IN"
+        ):
+            lookups["get_transfer_details"].add(act["externalCanonicalId"])
+        elif formatter is _format_corporate_action_subdivision:
+            lookups["get_corporate_action_child_activities"].add(act["canonicalId"])
+            if act["currency"] is None:
+                lookups["get_security_market_data"].add(act["securityId"])
+    return lookups
+
+
+class _PrefetchedContext:
+    """API context serving lookups from prefetched results, when available."""
+
+    def __init__(self, api_context, prefetch: dict[str, dict]):
+        self._api_context = api_context
+        self._prefetch = prefetch
+
+    def __getattr__(self, name):
+        method = getattr(self._api_context, name)
+        results = self._prefetch.get(name)
+        if not results:
+            return method
+
+        def lookup(key):
+            return results[key] if key in results else method(key)
+
+        return lookup
+
+
+def format_activity_description(
+    act: dict, api_context, prefetch: dict[str, dict] | None = None
+) -> None:
+    """Add human-readable description to an activity dict.
+
+    Args:
+        act: Activity dictionary to modify in place.
+        api_context: API context object providing methods like:
+            - get_account_by_id(account_id: str), or else get_accounts(open_only: bool)
+            - security_id_to_symbol(security_id: str)
+            - get_corporate_action_child_activities(activity_canonical_id: str)
+            - get_security_market_data(security_id: str)
+            - get_etf_details(funding_id: str)
+            - get_transfer_details(transfer_id: str)
+        prefetch: Optional results of api_context lookups, as a dict mapping a method
+            name to a dict of {id: result}; see collect_activity_lookups(). IDs
+            missing from it are looked up using api_context.
+    """
+    type_, sub_type = act["type"], act["subType"]
+    act["description"] = f"{type_}: {sub_type}"
+
+    if prefetch:
+        api_context = _PrefetchedContext(api_context, prefetch)
 
-    elif act["type"] == "FEE" and act["subType"] == "MANAGEMENT_FEE":
-        act["description"] = "Management fee"
+    handler = _get_activity_formatter(type_, sub_type)
+    if handler:
+        handler(act, api_context)
 
     # TODO: Add other types as needed
@@ -1,8 +1,9 @@
-from dataclasses import dataclass, asdict
-import json
+from dataclasses import dataclass, fields
 
+from ws_api._json import dumps, loads
 
-@dataclass
+
+@dataclass(slots=True)
 class OAuthSession:
     """
     A class representing an OAuth session.
@@ -18,7 +19,7 @@ class OAuthSession:
     refresh_token: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class WSAPISession(OAuthSession):
     """
     A class representing a WSAPI session, extending OAuthSession.
@@ -34,8 +35,16 @@ class WSAPISession(OAuthSession):
     token_info: dict | None = None
 
     def to_json(self) -> str:
-        return json.dumps(asdict(self), ensure_ascii=False)
+        return self.to_json_bytes().decode()
+
+    def to_json_bytes(self) -> bytes:
+        # Flat dataclass; build the dict directly rather than via asdict()'s
+        # recursive deepcopy, since it is serialized straight away.
+        return dumps({name: getattr(self, name) for name in _SESSION_FIELDS})
 
     @classmethod
-    def from_json(cls, json_str: str) -> "WSAPISession":
-        return cls(**json.loads(json_str))
+    def from_json(cls, json_str: str | bytes) -> "WSAPISession":
+        return cls(**loads(json_str))
+
+
+_SESSION_FIELDS = tuple(f.name for f in fields(WSAPISession))
@@ -1,12 +1,29 @@
+import base64
 import re
-import uuid
-from collections.abc import Callable
-from datetime import datetime, timedelta
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from functools import cache
 from inspect import signature
-from typing import Any
+from operator import itemgetter
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - depends on the installed extras
+    ijson = None
+
+from ws_api._json import JSONDecodeError, dumps, loads
 from ws_api.exceptions import (
     CurlException,
     LoginFailedException,
@@ -16,24 +33,184 @@ from ws_api.exceptions import (
     WSApiException,
 )
 from ws_api.formatters import (
+    collect_activity_lookups,
     format_account_description,
     format_activity_description,
 )
-from ws_api.graphql_queries import GRAPHQL_QUERIES
+from ws_api.graphql_queries import (
+    GRAPHQL_QUERIES,
+    GRAPHQL_QUERIES_MINIFIED,
+    minify_query,
+)
 from ws_api.session import WSAPISession
 
+if TYPE_CHECKING:
+    # typing.Self needs Python 3.11
+    from typing_extensions import Self
+
+# Patterns used by start_session() to scrape the login page and app JS
+_WSSDI_RE = re.compile(r"\bwssdi=([a-f0-9-]+);", re.IGNORECASE)
+_APP_JS_URL_RE = re.compile(r'<script.*src="(.+/app-[a-f0-9]+\.js)', re.IGNORECASE)
+_CLIENT_ID_RE = re.compile(r'"production"[^}]*clientId:"([a-f0-9]+)"', re.IGNORECASE)
+# Statuses (matched anywhere in the lowercased status) of activities that didn't happen
+_EXCLUDED_STATUS_RE = re.compile("rejected|cancelled|expired")
+
+_GET_NODE = itemgetter("node")
+# ijson events starting and ending objects or arrays; see _stream_graphql_query()
+_START_EVENTS = frozenset({"start_map", "start_array"})
+_END_EVENTS = frozenset({"end_map", "end_array"})
+# Format of the dates sent in GraphQL query variables
+_WS_DT_FMT = "%Y-%m-%dT%H:%M:%S.%fZ"
+# Balances in these are cash, not securities with a symbol
+_CASH_SECURITY_IDS = frozenset({"sec-c-cad", "sec-c-usd"})
+
+
+def _arity(fct: Callable) -> int:
+    """Number of parameters of a (persist session) callback."""
+    # Not cached: callbacks may be unhashable, and this only runs on login/refresh
+    return len(signature(fct).parameters)
+
+
+def _is_not_authorized(response: Any) -> bool:
+    """Whether an API error response means that the access token is not valid."""
+    if not isinstance(response, dict):
+        return False
+    errors = response.get("errors")
+    return response.get("message") == "Not Authorized." or bool(
+        errors and errors[0].get("message") == "Not Authorized."
+    )
+
+
+def _freeze(value: Any) -> Any:
+    """Turn (nested) GraphQL variables into a hashable value, for use as a cache key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@cache
+def _split_response_path(data_response_path: str) -> tuple[str, ...]:
+    """Split a dotted GraphQL data_response_path into its keys (call sites use a
+    handful of literal paths, so this is computed once per path)."""
+    return tuple(data_response_path.split("."))
+
+
+@cache
+def _security_market_data_batch_query(count: int) -> str:
+    """Build a query fetching the market data of `count` securities, aliased s0..sN."""
+    # Reuse the fragments of FetchSecurityMarketData
+    fragments = GRAPHQL_QUERIES["FetchSecurityMarketData"].partition("\n}\n\n")[2]
+    params = ", ".join(f"$id{i}: ID!" for i in range(count))
+    fields = "".join(
+        f"  s{i}: security(id: $id{i}) {{\n    id\n    ...SecurityMarketData\n"
+        "    __typename\n  }\n"
+        for i in range(count)
+    )
+    return minify_query(
+        f"query FetchSecuritiesMarketData({params}) {{\n{fields}}}\n\n{fragments}"
+    )
+
+
+class _LRUCache(OrderedDict):
+    """Dict that forgets its least recently used entries beyond maxsize."""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value) -> None:
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+
 
 class WealthsimpleAPIBase:
     OAUTH_BASE_URL = "https://api.production.wealthsimple.com/v1/oauth/v2"
     GRAPHQL_URL = "https://my.wealthsimple.com/graphql"
     GRAPHQL_VERSION = "12"
+    _GRAPHQL_HEADERS = MappingProxyType(
+        {
+            "x-ws-profile": "trade",
+            "x-ws-api-version": GRAPHQL_VERSION,
+            "x-ws-locale": "en-CA",
+            "x-platform-os": "web",
+        }
+    )
+    # Headers of the OAuth requests (token refresh, login & token info)
+    _OAUTH_REFRESH_HEADERS = MappingProxyType(
+        {
+            "x-wealthsimple-client": "@wealthsimple/wealthsimple",
+            "x-ws-profile": "invest",
+        }
+    )
+    _OAUTH_LOGIN_HEADERS = MappingProxyType(
+        {
+            "x-wealthsimple-client": "@wealthsimple/wealthsimple",
+            "x-ws-profile": "undefined",
+        }
+    )
+    _OAUTH_TOKEN_INFO_HEADERS = MappingProxyType(
+        {"x-wealthsimple-client": "@wealthsimple/wealthsimple"}
+    )
+    # Number of ID-keyed lookup results (transfers, etc.) kept in memory
+    LOOKUP_CACHE_MAX_SIZE = 4096
 
     def __init__(self, sess: WSAPISession | None = None):
         self.security_market_data_cache_getter = None
         self.security_market_data_cache_setter = None
+        # Results of ID-keyed lookups, by (query name, ID); see _cached_lookup()
+        self._lookup_cache = _LRUCache(self.LOOKUP_CACHE_MAX_SIZE)
+        # Results of do_graphql_query(..., cache=True), as (expires at, data)
+        self._query_cache: dict[tuple, tuple[float, Any]] = {}
+        # See identity_id
+        self._identity_id: str | None = None
+        # Last persist_session_fct given to check_oauth_token() or login_internal()
+        self._persist_session_fct: Callable | None = None
+        self._persist_session_username: str | None = None
+        # "Bearer ..." header value, and the access token it was built for
+        self._auth_header: tuple[str | None, str | None] = (None, None)
+        # Held while refreshing the access token, so that concurrent requests finding
+        # it expired refresh it only once
+        self._refresh_lock = threading.Lock()
+        # Long-lived HTTP session, to reuse connections (and TLS handshakes) across requests
+        self._http = requests.Session()
+        self._http.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=[502, 503, 504],
+                    raise_on_status=False,
+                ),
+            ),
+        )
         self.session = WSAPISession()
         self.start_session(sess)
 
+    def __enter__(self) -> "Self":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._http.close()
+
     user_agent: str | None = None
 
     @staticmethod
@@ -42,17 +219,25 @@ class WealthsimpleAPIBase:
 
     @staticmethod
     def uuidv4() -> str:
-        return str(uuid.uuid4())
-
-    def send_http_request(
-        self,
-        url: str,
-        method: str = "POST",
-        data: dict | None = None,
-        headers: dict | None = None,
-        return_headers: bool = False,
-    ) -> Any:
-        headers = headers or {}
+        b = bytearray(secrets.token_bytes(16))
+        b[6] = (b[6] & 0x0F) | 0x40  # version 4
+        b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+        h = b.hex()
+        return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+    def _authorization_header(self) -> str:
+        # Rebuilt only when the access token changes (login, refresh, or a session
+        # field set by the caller)
+        token = self.session.access_token
+        if self._auth_header[0] != token:
+            self._auth_header = (token, f"Bearer {token}")
+        return self._auth_header[1]
+
+    def _build_request_headers(
+        self, method: str, data: dict | None, headers: Mapping[str, str] | None
+    ) -> dict:
+        # Copy, so that callers can pass shared (e.g. constant) header dicts
+        headers = dict(headers) if headers else {}
         if method == "POST":
             headers["Content-Type"] = "application/json"
 
@@ -62,7 +247,7 @@ class WealthsimpleAPIBase:
         if self.session.access_token and (
             not data or data.get("grant_type") != "refresh_token"
         ):
-            headers["Authorization"] = f"Bearer {self.session.access_token}"
+            headers["Authorization"] = self._authorization_header()
 
         if self.session.wssdi:
             headers["x-ws-device-id"] = self.session.wssdi
@@ -70,22 +255,40 @@ class WealthsimpleAPIBase:
         if WealthsimpleAPI.user_agent:
             headers["User-Agent"] = WealthsimpleAPI.user_agent
 
+        return headers
+
+    def send_http_request(
+        self,
+        url: str,
+        method: str = "POST",
+        data: dict | None = None,
+        headers: Mapping[str, str] | None = None,
+        return_headers: bool = False,
+    ) -> Any:
+        headers = self._build_request_headers(method, data, headers)
+
         try:
-            response = requests.request(method, url, json=data, headers=headers)
+            response = self._http.request(
+                method,
+                url,
+                data=dumps(data) if data is not None else None,
+                headers=headers,
+            )
 
             if return_headers:
-                # Combine headers and body as a single string
-                response_headers = "\r\n".join(
-                    f"{k}: {v}" for k, v in response.headers.items()
-                )
-                return f"{response_headers}\r\n\r\n{response.text}"
+                # Case-insensitive headers (repeated ones, like Set-Cookie, are
+                # comma-joined) and the body as text
+                return response.headers, response.text
 
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return loads(response.content)
+        except (requests.exceptions.RequestException, JSONDecodeError) as e:
             raise CurlException(f"HTTP request failed: {e}")
 
     def send_get(
-        self, url: str, headers: dict | None = None, return_headers: bool = False
+        self,
+        url: str,
+        headers: Mapping[str, str] | None = None,
+        return_headers: bool = False,
     ) -> Any:
         return self.send_http_request(
             url, "GET", headers=headers, return_headers=return_headers
@@ -95,7 +298,7 @@ class WealthsimpleAPIBase:
         self,
         url: str,
         data: dict,
-        headers: dict | None = None,
+        headers: Mapping[str, str] | None = None,
         return_headers: bool = False,
     ) -> Any:
         return self.send_http_request(
@@ -109,29 +312,26 @@ class WealthsimpleAPIBase:
             self.session.session_id = sess.session_id
             self.session.client_id = sess.client_id
             self.session.refresh_token = sess.refresh_token
+            self.session.token_info = sess.token_info
             return
 
         app_js_url = None
 
         if not self.session.wssdi or not self.session.client_id:
             # Fetch login page
-            response = self.send_get(
+            response_headers, body = self.send_get(
                 "https://my.wealthsimple.com/app/login", return_headers=True
             )
 
-            for line in response.splitlines():
-                # Look for wssdi in set-cookie headers
-                if not self.session.wssdi and "set-cookie:" in line.lower():
-                    match = re.search(r"wssdi=([a-f0-9-]+);", line, re.IGNORECASE)
-                    if match:
-                        self.session.wssdi = match.group(1)
+            # Look for wssdi in set-cookie headers
+            if not self.session.wssdi:
+                match = _WSSDI_RE.search(response_headers.get("set-cookie", ""))
+                if match:
+                    self.session.wssdi = match.group(1)
 
-                if not app_js_url and "<script" in line.lower():
-                    match = re.search(
-                        r'<script.*src="(.+/app-[a-f0-9]+\.js)', line, re.IGNORECASE
-                    )
-                    if match:
-                        app_js_url = match.group(1)
+            match = _APP_JS_URL_RE.search(body)
+            if match:
+                app_js_url = match.group(1)
 
             if not self.session.wssdi:
                 raise UnexpectedException(
@@ -145,12 +345,10 @@ class WealthsimpleAPIBase:
                 )
 
             # Fetch the app JS file
-            response = self.send_get(app_js_url, return_headers=True)
+            _, app_js = self.send_get(app_js_url, return_headers=True)
 
             # Look for clientId in the app JS file
-            match = re.search(
-                r'"production"[^}]*clientId:"([a-f0-9]+)"', response, re.IGNORECASE
-            )
+            match = _CLIENT_ID_RE.search(app_js)
             if match:
                 self.session.client_id = match.group(1)
 
@@ -158,7 +356,7 @@ class WealthsimpleAPIBase:
                 raise UnexpectedException("Couldn't find clientId in app JS.")
 
         if not self.session.session_id:
-            self.session.session_id = str(uuid.uuid4())
+            self.session.session_id = self.uuidv4()
 
     def search_security(self, query):
         # Fetch security search results using GraphQL query
@@ -169,45 +367,108 @@ class WealthsimpleAPIBase:
             "array",
         )
 
+    # Access tokens expiring within this many seconds are refreshed before being used
+    TOKEN_EXPIRY_MARGIN = 60
+    # How long (seconds) do_graphql_query(..., cache=True) results are reused, and
+    # how many are kept at most
+    QUERY_CACHE_TTL = 60
+    QUERY_CACHE_MAX_SIZE = 256
+
+    def _access_token_expires_at(self) -> float | None:
+        """Return when the access token expires (epoch seconds), if known from its own
+        claims (JWT exp) or from token_info."""
+        claims = self._jwt_payload()
+        if claims and isinstance(claims.get("exp"), (int, float)):
+            return float(claims["exp"])
+
+        # expires_in is the time that was left when token_info was received, so only
+        # the expires_at computed then (see get_token_info()) can be relied upon
+        token_info = self.session.token_info
+        try:
+            return float(token_info["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _update_access_token_expiry(self, token_response: dict) -> None:
+        """Copy the expiry of a newly obtained access token into the cached token_info."""
+        token_info = self.session.token_info
+        if token_info and "expires_in" in token_response:
+            token_info["expires_in"] = token_response["expires_in"]
+            token_info["created_at"] = token_response.get(
+                "created_at", int(time.time())
+            )
+            token_info["expires_at"] = time.time() + float(token_info["expires_in"])
+
     def check_oauth_token(
         self, persist_session_fct: Callable | None = None, username=None
     ):
+        if persist_session_fct:
+            # Also used when a query finds the access token revoked; see
+            # do_graphql_query()
+            self._persist_session_fct = persist_session_fct
+            self._persist_session_username = username
+
+        checked_access_token = self.session.access_token
         if self.session.access_token:
-            try:
-                self.search_security("XEQT")
-            except WSApiException as e:
-                is_not_authorized = e.response is not None and (e.response.get("message") == "Not Authorized." or ('errors' in e.response and e.response.get('errors')[0].get("message") == "Not Authorized."))
-                if not is_not_authorized:
-                    raise
-                # Access token expired; try to refresh it below
+            expires_at = self._access_token_expires_at()
+            if expires_at is not None:
+                if time.time() < expires_at - self.TOKEN_EXPIRY_MARGIN:
+                    return
+                # Access token expired (or about to); refresh it below
             else:
-                return
+                # Unknown expiry; probe the API to find out if the token is still valid
+                try:
+                    self.search_security("XEQT")
+                except WSApiException as e:
+                    if not _is_not_authorized(e.response):
+                        raise
+                    # Access token expired; try to refresh it below
+                else:
+                    return
+
+        self._refresh_access_token(checked_access_token, persist_session_fct, username)
+
+    def _refresh_access_token(
+        self,
+        checked_access_token: str | None,
+        persist_session_fct: Callable | None,
+        username: str | None,
+    ) -> None:
+        """Refresh the access token, unless it changed since checked_access_token was
+        found expired or revoked.
 
-        if self.session.refresh_token:
-            data = {
-                "grant_type": "refresh_token",
-                "refresh_token": self.session.refresh_token,
-                "client_id": self.session.client_id,
-            }
-            headers = {
-                "x-wealthsimple-client": "@wealthsimple/wealthsimple",
-                "x-ws-profile": "invest",
-            }
-            response = self.send_post(f"{self.OAUTH_BASE_URL}/token", data, headers)
-            if "access_token" not in response or "refresh_token" not in response:
-                raise ManualLoginRequired(
-                    f"OAuth token invalid and cannot be refreshed: {response.get('error', 'Invalid response from API')}"
+        Raises:
+            ManualLoginRequired: If the access token cannot be refreshed.
+        """
+        with self._refresh_lock:
+            if self.session.access_token != checked_access_token:
+                # Already refreshed by another thread while we waited for the lock
+                return
+            if self.session.refresh_token:
+                data = {
+                    "grant_type": "refresh_token",
+                    "refresh_token": self.session.refresh_token,
+                    "client_id": self.session.client_id,
+                }
+                response = self.send_post(
+                    f"{self.OAUTH_BASE_URL}/token", data, self._OAUTH_REFRESH_HEADERS
                 )
-            self.session.access_token = response["access_token"]
-            self.session.refresh_token = response["refresh_token"]
-            if persist_session_fct:
-                if len(signature(persist_session_fct).parameters) == 2:
-                    persist_session_fct(self.session.to_json(), username)
-                else:
-                    persist_session_fct(self.session.to_json())
-            return
+                if "access_token" not in response or "refresh_token" not in response:
+                    raise ManualLoginRequired(
+                        f"OAuth token invalid and cannot be refreshed: {response.get('error', 'Invalid response from API')}"
+                    )
+                self.session.access_token = response["access_token"]
+                self.session.refresh_token = response["refresh_token"]
+                self._update_access_token_expiry(response)
+                self._clear_caches()
+                if persist_session_fct:
+                    if _arity(persist_session_fct) == 2:
+                        persist_session_fct(self.session.to_json(), username)
+                    else:
+                        persist_session_fct(self.session.to_json())
+                return
 
-        raise ManualLoginRequired("OAuth token invalid and cannot be refreshed.")
+            raise ManualLoginRequired("OAuth token invalid and cannot be refreshed.")
 
     SCOPE_READ_ONLY = "invest.read trade.read tax.read"
     SCOPE_READ_WRITE = (
@@ -232,24 +493,16 @@ class WealthsimpleAPIBase:
             "otp_claim": None,
         }
 
-        headers = {
-            "x-wealthsimple-client": "@wealthsimple/wealthsimple",
-            "x-ws-profile": "undefined",
-        }
-
+        headers = self._OAUTH_LOGIN_HEADERS
         if otp_answer:
-            headers["x-wealthsimple-otp"] = f"{otp_answer};remember=true"
+            headers = {**headers, "x-wealthsimple-otp": f"{otp_answer};remember=true"}
 
         # Send the POST request for token
         response_data = self.send_post(
             url=f"{self.OAUTH_BASE_URL}/token", data=data, headers=headers
         )
 
-        if (
-            "error" in response_data
-            and response_data["error"] == "invalid_grant"
-            and otp_answer is None
-        ):
+        if response_data.get("error") == "invalid_grant" and otp_answer is None:
             raise OTPRequiredException("2FA code required")
 
         if "error" in response_data:
@@ -258,10 +511,14 @@ class WealthsimpleAPIBase:
         # Update the session with the tokens
         self.session.access_token = response_data["access_token"]
         self.session.refresh_token = response_data["refresh_token"]
+        self._update_access_token_expiry(response_data)
+        self._clear_caches()
 
         # Persist the session if a persist function is provided
         if persist_session_fct:
-            if len(signature(persist_session_fct).parameters) == 2:
+            self._persist_session_fct = persist_session_fct
+            self._persist_session_username = username
+            if _arity(persist_session_fct) == 2:
                 persist_session_fct(self.session.to_json(), username)
             else:
                 persist_session_fct(self.session.to_json())
@@ -277,24 +534,244 @@ class WealthsimpleAPIBase:
         filter_fn: Callable[[Any], bool] | None = None,
         *,
         load_all_pages: bool = False,
+        cache: bool = False,
+        factory: Callable[[dict], Any] | None = None,
     ):
+        """Run a GraphQL query and return the data found at data_response_path.
+
+        With cache=True, the (unfiltered) result is kept for QUERY_CACHE_TTL seconds,
+        and identical queries (same name, variables, path and paging) made in the
+        meantime are answered from memory. Cached objects are shared between callers.
+
+        For array results, factory (e.g. a dataclass' from_dict) converts each item
+        before it is passed to filter_fn and returned.
+        """
+        if factory is not None and expect_type != "array":
+            raise UnexpectedException(
+                "Can't apply a factory to GraphQL queries that do not return arrays"
+            )
+
+        if cache:
+            return self._cached_graphql_query(
+                query_name,
+                variables,
+                data_response_path,
+                expect_type,
+                filter_fn,
+                load_all_pages,
+                factory,
+            )
+
+        if load_all_pages and expect_type != "array":
+            raise UnexpectedException(
+                "Can't load all pages for GraphQL queries that do not return arrays"
+            )
+
+        results = []
+        refreshed = False
+        while True:
+            access_token = self.session.access_token
+            query, headers = self._build_graphql_request(query_name, variables)
+            response_data = self.send_post(
+                url=self.GRAPHQL_URL, data=query, headers=headers
+            )
+            try:
+                data, end_cursor = self._parse_graphql_response(
+                    query_name,
+                    response_data,
+                    data_response_path,
+                    expect_type,
+                    filter_fn,
+                    factory,
+                )
+            except WSApiException as e:
+                if refreshed or not _is_not_authorized(e.response):
+                    raise
+                # The access token was revoked before it expired (e.g. when another
+                # process sharing the session refreshed it); refresh it and retry once
+                self._refresh_access_token(
+                    access_token,
+                    self._persist_session_fct,
+                    self._persist_session_username,
+                )
+                refreshed = True
+                continue
+            if not load_all_pages:
+                return data
+
+            # Pages are cursor-based, so each one needs the previous one's endCursor
+            results.extend(data)
+            if not end_cursor:
+                return results
+            variables["cursor"] = end_cursor
+
+    def _cached_graphql_query(
+        self,
+        query_name: str,
+        variables: dict,
+        data_response_path: str,
+        expect_type: str,
+        filter_fn: Callable[[Any], bool] | None,
+        load_all_pages: bool,
+        factory: Callable[[dict], Any] | None,
+    ):
+        key = (
+            query_name,
+            _freeze(variables),
+            data_response_path,
+            expect_type,
+            load_all_pages,
+        )
+        now = time.monotonic()
+        entry = self._query_cache.get(key)
+        if entry is not None and entry[0] > now:
+            data = entry[1]
+        else:
+            # Copy, so that the pagination cursor doesn't leak into the caller's dict
+            data = self.do_graphql_query(
+                query_name,
+                dict(variables),
+                data_response_path,
+                expect_type,
+                load_all_pages=load_all_pages,
+            )
+            if len(self._query_cache) >= self.QUERY_CACHE_MAX_SIZE:
+                self._query_cache = {
+                    k: v for k, v in self._query_cache.items() if v[0] > now
+                }
+                while len(self._query_cache) >= self.QUERY_CACHE_MAX_SIZE:
+                    # Oldest first
+                    del self._query_cache[next(iter(self._query_cache))]
+            self._query_cache[key] = (now + self.QUERY_CACHE_TTL, data)
+
+        if isinstance(data, list):
+            items = map(factory, data) if factory else data
+            return [item for item in items if not filter_fn or filter_fn(item)]
+        return data
+
+    def _clear_caches(self) -> None:
+        """Forget cached API results, e.g. when the logged-in user may have changed."""
+        self._lookup_cache.clear()
+        self._query_cache.clear()
+        self._identity_id = None
+
+    def do_graphql_query_streaming(
+        self,
+        query_name: str,
+        variables: dict,
+        data_response_path: str,
+        filter_fn: Callable[[Any], bool] | None = None,
+        *,
+        load_all_pages: bool = False,
+    ) -> Iterator:
+        """Like do_graphql_query for array results, but parse the response
+        incrementally and yield its items one at a time, instead of materializing
+        the whole response first. Useful for large (paginated) feeds.
+
+        Requires the `streaming` extra: pip install "ws-api[streaming]"
+        """
+        # Checked here rather than in the generator, so that it fails when called
+        if ijson is None:
+            raise ImportError(
+                'do_graphql_query_streaming requires ijson; install it with: pip install "ws-api[streaming]"'
+            )
+        return self._stream_graphql_query(
+            query_name, variables, data_response_path, filter_fn, load_all_pages
+        )
+
+    def _stream_graphql_query(
+        self,
+        query_name: str,
+        variables: dict,
+        data_response_path: str,
+        filter_fn: Callable[[Any], bool] | None,
+        load_all_pages: bool,
+    ) -> Iterator:
+        # Edges are unwrapped to their nodes, like do_graphql_query does
+        if data_response_path.rpartition(".")[2] == "edges":
+            item_prefix = f"data.{data_response_path}.item.node"
+        else:
+            item_prefix = f"data.{data_response_path}.item"
+        page_info_prefix = f"data.{data_response_path.rpartition('.')[0]}.pageInfo"
+
+        while True:
+            query, headers = self._build_graphql_request(query_name, variables)
+            headers = self._build_request_headers("POST", query, headers)
+            has_next_page, end_cursor, found = False, None, False
+            try:
+                with self._http.request(
+                    "POST",
+                    self.GRAPHQL_URL,
+                    data=dumps(query),
+                    headers=headers,
+                    stream=True,
+                ) as response:
+                    if not response.ok:
+                        try:
+                            error_data = loads(response.content)
+                        except JSONDecodeError:
+                            error_data = response.text
+                        raise WSApiException(
+                            f"GraphQL query failed: {query_name} (HTTP {response.status_code})",
+                            error_data,
+                        )
+                    response.raw.decode_content = True
+                    builder = None
+                    for prefix, event, value in ijson.parse(
+                        response.raw, use_float=True
+                    ):
+                        if builder is not None:
+                            builder.event(event, value)
+                            if prefix == item_prefix and event in _END_EVENTS:
+                                item = builder.value
+                                builder = None
+                                if not filter_fn or filter_fn(item):
+                                    yield item
+                        elif prefix == item_prefix:
+                            found = True
+                            if event in _START_EVENTS:
+                                builder = ijson.ObjectBuilder()
+                                builder.event(event, value)
+                            elif not filter_fn or filter_fn(value):
+                                # Scalar (or null) item
+                                yield value
+                        elif prefix == f"data.{data_response_path}":
+                            found = True
+                        elif prefix == f"{page_info_prefix}.hasNextPage":
+                            has_next_page = bool(value)
+                        elif prefix == f"{page_info_prefix}.endCursor":
+                            end_cursor = value
+            except (requests.exceptions.RequestException, ijson.JSONError) as e:
+                raise CurlException(f"HTTP request failed: {e}")
+
+            if not found:
+                raise WSApiException(f"GraphQL query failed: {query_name}")
+
+            if not load_all_pages or not has_next_page or not end_cursor:
+                return
+            variables["cursor"] = end_cursor
+
+    def _build_graphql_request(
+        self, query_name: str, variables: dict, query_text: str | None = None
+    ) -> tuple[dict, MappingProxyType]:
         query = {
             "operationName": query_name,
-            "query": GRAPHQL_QUERIES[query_name],
+            "query": query_text or GRAPHQL_QUERIES_MINIFIED[query_name],
             "variables": variables,
         }
 
-        headers = {
-            "x-ws-profile": "trade",
-            "x-ws-api-version": self.GRAPHQL_VERSION,
-            "x-ws-locale": "en-CA",
-            "x-platform-os": "web",
-        }
-
-        response_data = self.send_post(
-            url=self.GRAPHQL_URL, data=query, headers=headers
-        )
+        return query, self._GRAPHQL_HEADERS
 
+    @staticmethod
+    def _parse_graphql_response(
+        query_name: str,
+        response_data: dict,
+        data_response_path: str,
+        expect_type: str,
+        filter_fn: Callable[[Any], bool] | None,
+        factory: Callable[[dict], Any] | None = None,
+    ) -> tuple[Any, str | None]:
+        """Extract the requested data (and next page cursor) from a GraphQL response."""
         if "data" not in response_data:
             raise WSApiException(f"GraphQL query failed: {query_name}", response_data)
 
@@ -303,20 +780,16 @@ class WealthsimpleAPIBase:
         end_cursor = None
 
         # Access the nested data using the data_response_path
-        for key in data_response_path.split("."):
-            if key not in data:
+        for key in _split_response_path(data_response_path):
+            try:
+                data = data[key]
+            except (KeyError, TypeError):
                 raise WSApiException(
                     f"GraphQL query failed: {query_name}", response_data
                 )
-            data = data[key]
-            if (
-                isinstance(data, dict)
-                and "pageInfo" in data
-                and isinstance(data["pageInfo"], dict)
-                and data["pageInfo"].get("hasNextPage")
-                and "endCursor" in data["pageInfo"]
-            ):
-                end_cursor = data["pageInfo"].get("endCursor")
+            page_info = data.get("pageInfo") if isinstance(data, dict) else None
+            if isinstance(page_info, dict) and page_info.get("hasNextPage"):
+                end_cursor = page_info.get("endCursor")
 
         # Ensure the data type matches the expected one (either array or object)
         if (expect_type == "array" and not isinstance(data, list)) or (
@@ -325,39 +798,74 @@ class WealthsimpleAPIBase:
             raise WSApiException(f"GraphQL query failed: {query_name}", response_data)
 
         # noinspection PyUnboundLocalVariable
-        if key == "edges":
-            data = [edge["node"] for edge in data]
-
-        if filter_fn:
-            data = list(filter(filter_fn, data))
+        if factory is not None:
+            items = map(factory, map(_GET_NODE, data) if key == "edges" else data)
+            data = list(filter(filter_fn, items) if filter_fn else items)
+        elif key == "edges":
+            if filter_fn:
+                # Unwrap & filter in a single pass
+                data = [node for edge in data if filter_fn(node := edge["node"])]
+            else:
+                data = list(map(_GET_NODE, data))
+        elif filter_fn:
+            data = [item for item in data if filter_fn(item)]
 
-        if load_all_pages:
-            if expect_type != "array":
-                raise UnexpectedException(
-                    "Can't load all pages for GraphQL queries that do not return arrays"
-                )
-            if end_cursor:
-                variables["cursor"] = end_cursor
-                more_data = self.do_graphql_query(
-                    query_name,
-                    variables,
-                    data_response_path,
-                    expect_type,
-                    filter_fn,
-                    load_all_pages=True,
-                )
-                if isinstance(data, list) and isinstance(more_data, list):
-                    data += more_data
+        return data, end_cursor
 
-        return data
+    def _cached_lookup(
+        self, query_name: str, key: str, fetch_fct: Callable[[], Any]
+    ) -> Any:
+        cache_key = (query_name, key)
+        try:
+            return self._lookup_cache[cache_key]
+        except KeyError:
+            value = self._lookup_cache[cache_key] = fetch_fct()
+            return value
+
+    def _jwt_payload(self) -> dict | None:
+        """Decode the claims of the access token, if it is a JWT (unverified; only
+        used to avoid API round trips for values the token already carries)."""
+        try:
+            segment = self.session.access_token.split(".")[1]
+            payload = loads(
+                base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+            )
+        except (AttributeError, IndexError, ValueError):
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    @property
+    def identity_id(self) -> str | None:
+        """Identity ID of the logged-in user; looked up once, until the next login."""
+        if not self._identity_id:
+            self._identity_id = self._identity_canonical_id()
+        return self._identity_id
+
+    def _identity_canonical_id(self) -> str | None:
+        """Return the identity ID of the logged-in user, from the access token claims
+        when available, or else from get_token_info()."""
+        claims = self._jwt_payload() or {}
+        identity_id = claims.get("identity_canonical_id")
+        if not identity_id and str(claims.get("sub", "")).startswith("identity-"):
+            identity_id = claims["sub"]
+        return identity_id or self.get_token_info().get("identity_canonical_id")
 
     def get_token_info(self):
-        if not self.session.token_info:
-            headers = {"x-wealthsimple-client": "@wealthsimple/wealthsimple"}
-            response = self.send_get(
-                self.OAUTH_BASE_URL + "/token/info", headers=headers
-            )
-            self.session.token_info = response
+        # token_info is part of the session, so it survives a persist/from_json
+        # round-trip; only re-fetch it once the access token it describes expires.
+        token_info = self.session.token_info
+        if token_info and (
+            "expires_at" not in token_info
+            or token_info["expires_at"] > time.time() + self.TOKEN_EXPIRY_MARGIN
+        ):
+            return token_info
+
+        response = self.send_get(
+            self.OAUTH_BASE_URL + "/token/info", headers=self._OAUTH_TOKEN_INFO_HEADERS
+        )
+        if isinstance(response, dict) and "expires_in" in response:
+            response["expires_at"] = time.time() + float(response["expires_in"])
+        self.session.token_info = response
         return self.session.token_info
 
     @staticmethod
@@ -389,47 +897,140 @@ class WealthsimpleAPIBase:
             username, password, otp_answer, persist_session_fct, scope
         )
 
-    @staticmethod
+    @classmethod
     def from_token(
+        cls,
         sess: WSAPISession,
         persist_session_fct: Callable | None = None,
         username: str | None = None,
     ):
-        ws = WealthsimpleAPI(sess)
+        ws = cls(sess)
         ws.check_oauth_token(persist_session_fct, username)
         return ws
 
 
 class WealthsimpleAPI(WealthsimpleAPIBase):
+    # Maximum number of concurrent requests used to prefetch activity details
+    PREFETCH_MAX_WORKERS = 8
+    # Securities fetched per aliased query by get_securities_market_data()
+    SECURITY_MARKET_DATA_BATCH_SIZE = 50
+    # Query names under which the lookups of format_activities() are cached
+    _LOOKUP_QUERY_NAMES = MappingProxyType(
+        {
+            "get_etf_details": "FetchFundsTransfer",
+            "get_transfer_details": "FetchInstitutionalTransfer",
+            "get_corporate_action_child_activities": "FetchCorporateActionChildActivities",
+        }
+    )
+
     def __init__(self, sess: WSAPISession | None = None) -> None:
         super().__init__(sess)
         self.account_cache = {}
+        self._accounts_by_id = {}
+        # Thread pools, by purpose ("gather" or "prefetch"); see _thread_pool()
+        self._thread_pools: dict[str, ThreadPoolExecutor] = {}
+        self._thread_pools_lock = threading.Lock()
+        # .active is set in the threads running the calls of gather()
+        self._gather_thread = threading.local()
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections, and the threads used for concurrency."""
+        with self._thread_pools_lock:
+            pools = list(self._thread_pools.values())
+            self._thread_pools.clear()
+        for pool in pools:
+            pool.shutdown()
+        super().close()
+
+    def _thread_pool(self, purpose: str) -> ThreadPoolExecutor:
+        """Return the thread pool used for purpose, created on first use.
+
+        gather() and format_activities() use separate pools, so that
+        format_activities() can itself run in gather() without waiting for a thread.
+        """
+        with self._thread_pools_lock:
+            pool = self._thread_pools.get(purpose)
+            if pool is None:
+                pool = self._thread_pools[purpose] = self._new_thread_pool(purpose)
+            return pool
+
+    def _new_thread_pool(self, purpose: str) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.PREFETCH_MAX_WORKERS,
+            thread_name_prefix=f"ws_api_{purpose}",
+            initializer=self._init_pool_thread,
+            initargs=(purpose,),
+        )
+
+    def _init_pool_thread(self, purpose: str) -> None:
+        self._gather_thread.active = purpose == "gather"
+
+    def gather(self, *callables: Callable[[], Any]) -> list:
+        """Run independent calls concurrently, and return their results in order.
+
+        The calls share this client's pooled HTTP connections, and run on up to
+        PREFETCH_MAX_WORKERS threads. If any of them raises, the first exception (in
+        argument order) is raised, once all of them are done. Calls can themselves
+        use gather(); nested calls then run in a temporary pool of their own.
+
+        Example:
+            accounts, positions = ws.gather(
+                ws.get_accounts, lambda: ws.get_identity_positions(None, "CAD")
+            )
+        """
+        if getattr(self._gather_thread, "active", False):
+            # All the threads of the shared pool may be waiting for this call
+            with self._new_thread_pool("gather") as pool:
+                return self._run_all(pool, callables)
+        return self._run_all(self._thread_pool("gather"), callables)
 
     @staticmethod
-    def _iso_z(dt: datetime | None) -> str | None:
-        return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ") if dt else None
+    def _run_all(pool: ThreadPoolExecutor, callables) -> list:
+        futures = [pool.submit(fct) for fct in callables]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def _iso_z(dt: datetime | str | None) -> str | None:
+        # Strings are assumed to be already formatted (e.g. by a previous call), and
+        # naive datetimes to be in UTC
+        if isinstance(dt, str):
+            return dt
+        if dt and dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc)
+        return dt.strftime(_WS_DT_FMT) if dt else None
 
     def get_accounts(self, open_only=True, use_cache=True):
         cache_key = "open" if open_only else "all"
         if not use_cache or cache_key not in self.account_cache:
-            filter_fn = (lambda acc: acc.get("status") == "open") if open_only else None
-
             accounts = self.do_graphql_query(
                 "FetchAllAccountFinancials",
                 {
                     "pageSize": 25,
-                    "identityId": self.get_token_info().get("identity_canonical_id"),
+                    "identityId": self.identity_id,
                 },
                 "identity.accounts.edges",
                 "array",
-                filter_fn=filter_fn,
                 load_all_pages=True,
             )
+            if open_only:
+                accounts = [acc for acc in accounts if acc.get("status") == "open"]
             for account in accounts:
                 format_account_description(account)
             self.account_cache[cache_key] = accounts
+            if not open_only:
+                self._accounts_by_id = {acc["id"]: acc for acc in accounts}
         return self.account_cache[cache_key]
 
+    def get_account_by_id(self, account_id: str) -> dict | None:
+        """Return the account with the given ID, or None if there is no such account.
+
+        Looks the account up in the (cached) list of all accounts; see get_accounts().
+        """
+        if "all" not in self.account_cache:
+            self.get_accounts(False)
+        return self._accounts_by_id.get(account_id)
+
     def get_account_balances(self, account_id):
         accounts = self.do_graphql_query(
             "FetchAccountsWithBalance",
@@ -441,14 +1042,35 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
             "array",
         )
 
+        return self._extract_balances(accounts[0])
+
+    def _extract_balances(self, account: dict) -> dict:
+        all_balances = [
+            balance
+            for custodian_account in account["custodianAccounts"]
+            for balance in custodian_account["financials"]["balance"]
+        ]
+
+        # Fetch the market data of all securities held in one batched query, so that
+        # security_id_to_symbol() below is served from the cache
+        if self.security_market_data_cache_getter:
+            security_ids = {
+                balance["securityId"] for balance in all_balances
+            } - _CASH_SECURITY_IDS
+            if security_ids:
+                try:
+                    self.get_securities_market_data(sorted(security_ids))
+                except (CurlException, WSApiException):
+                    # Looked up one at a time instead
+                    pass
+
         # Extracting balances and returning them in a dictionary
         balances = {}
-        for account in accounts[0]["custodianAccounts"]:
-            for balance in account["financials"]["balance"]:
-                security = balance["securityId"]
-                if security not in {"sec-c-cad", "sec-c-usd"}:
-                    security = self.security_id_to_symbol(security)
-                balances[security] = balance["quantity"]
+        for balance in all_balances:
+            security = balance["securityId"]
+            if security not in _CASH_SECURITY_IDS:
+                security = self.security_id_to_symbol(security)
+            balances[security] = balance["quantity"]
 
         return balances
 
@@ -489,7 +1111,7 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         return self.do_graphql_query(
             "FetchIdentityHistoricalFinancials",
             {
-                "identityId": self.get_token_info().get("identity_canonical_id"),
+                "identityId": self.identity_id,
                 "currency": currency,
                 "startDate": self._iso_z(start_date),
                 "endDate": self._iso_z(end_date),
@@ -507,8 +1129,8 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         how_many: int = 50,
         order_by: str = "OCCURRED_AT_DESC",
         ignore_rejected: bool = True,
-        start_date: datetime | None = None,
-        end_date: datetime | None = None,
+        start_date: datetime | str | None = None,
+        end_date: datetime | str | None = None,
         load_all: bool = False,
     ) -> list[Any]:
         """Retrieve activities for a specific account or list of accounts.
@@ -518,8 +1140,12 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
             how_many (int): The maximum number of activities to retrieve.
             order_by (str): The order in which to sort the activities.
             ignore_rejected (bool): Whether to ignore rejected or cancelled activities.
-            start_date (datetime, optional): The start date for filtering activities.
-            end_date (datetime, optional): The end date for filtering activities.
+            start_date (datetime | str, optional): The start date for filtering activities.
+            end_date (datetime | str, optional): The end date for filtering activities.
+                Defaults to the end of the current (local) day. Naive datetimes are
+                taken to be in UTC.
+                Dates can also be passed pre-formatted (see _iso_z), e.g. to reuse the
+                same end date when fetching the activities of many accounts.
             load_all (bool): Whether to load all pages of activities.
 
         Returns:
@@ -530,22 +1156,17 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         """
         if isinstance(account_id, str):
             account_id = [account_id]
-        # Calculate the end date for the condition
-        end_date = (
-            end_date
-            if end_date
-            else datetime.now()
-            + timedelta(hours=23, minutes=59, seconds=59, milliseconds=999)
+        # Defaults to the end of today, in the local time zone
+        end_date = end_date or datetime.now().astimezone().replace(
+            hour=23, minute=59, second=59, microsecond=999000
         )
 
         # Filter function to ignore rejected/cancelled/expired activities
         def filter_fn(activity):
             act_type = (activity.get("type", "") or "").upper()
             status = (activity.get("status", "") or "").lower()
-            excluded_statuses = {"rejected", "cancelled", "expired"}
-            is_excluded = any(s in status for s in excluded_statuses)
             return act_type != "LEGACY_TRANSFER" and (
-                not ignore_rejected or status == "" or not is_excluded
+                not ignore_rejected or not _EXCLUDED_STATUS_RE.search(status)
             )
 
         activities = self.do_graphql_query(
@@ -571,10 +1192,79 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
                 activities,
             )
         for act in activities:
-            format_activity_description(act, self)
+            # Interned, so comparisons with literals & dispatch lookups match by identity
+            if act.get("type"):
+                act["type"] = sys.intern(act["type"])
+            if act.get("subType"):
+                act["subType"] = sys.intern(act["subType"])
+        self.format_activities(activities)
 
         return activities
 
+    def format_activities(self, activities: list[dict]) -> None:
+        """Add human-readable descriptions to activities.
+
+        The details needed to describe the activities (securities, transfers, etc.)
+        are fetched first, instead of one at a time while formatting: the market data
+        of all securities in a single batched query, the rest concurrently.
+
+        Args:
+            activities: Activity dictionaries to modify in place.
+        """
+        needed = collect_activity_lookups(activities)
+
+        # Fetch the market data of all securities with one batched query; this also
+        # warms the market data cache that security_id_to_symbol() reads from
+        security_ids = set(needed["get_security_market_data"])
+        if self.security_market_data_cache_getter:
+            security_ids |= needed["security_id_to_symbol"]
+        prefetch = {}
+        if security_ids:
+            try:
+                prefetch["get_security_market_data"] = self.get_securities_market_data(
+                    sorted(security_ids)
+                )
+            except (CurlException, WSApiException):
+                # Looked up one at a time instead
+                pass
+
+        lookups = [
+            (name, key)
+            for name, keys in needed.items()
+            for key in keys
+            if self._needs_prefetch(name, key, prefetch)
+        ]
+
+        # A single lookup is simply made while formatting
+        if len(lookups) > 1:
+            pool = self._thread_pool("prefetch")
+            futures = [
+                (name, key, pool.submit(getattr(self, name), key))
+                for name, key in lookups
+            ]
+            for name, key, future in futures:
+                try:
+                    prefetch.setdefault(name, {})[key] = future.result()
+                except (CurlException, WSApiException):
+                    # Looked up again (and raised, if it still fails) while formatting
+                    pass
+
+        for act in activities:
+            format_activity_description(act, self, prefetch)
+
+    def _needs_prefetch(self, name: str, key: str, prefetch: dict) -> bool:
+        """Whether the lookup name(key) of format_activities() needs an API call."""
+        if key in prefetch.get(name, ()):
+            return False
+        if name == "security_id_to_symbol":
+            # Without a market data cache, symbols are not looked up; with one, the
+            # batched market data query has already filled it
+            return bool(
+                self.security_market_data_cache_getter
+            ) and key not in prefetch.get("get_security_market_data", ())
+        query_name = self._LOOKUP_QUERY_NAMES.get(name)
+        return query_name is None or (query_name, key) not in self._lookup_cache
+
     def security_id_to_symbol(self, security_id: str) -> str:
         security_symbol = f"[{security_id}]"
         if self.security_market_data_cache_getter:
@@ -589,19 +1279,27 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         return security_symbol
 
     def get_etf_details(self, funding_id):
-        return self.do_graphql_query(
+        return self._cached_lookup(
             "FetchFundsTransfer",
-            {"id": funding_id},
-            "fundsTransfer",
-            "object",
+            funding_id,
+            lambda: self.do_graphql_query(
+                "FetchFundsTransfer",
+                {"id": funding_id},
+                "fundsTransfer",
+                "object",
+            ),
         )
 
     def get_transfer_details(self, transfer_id):
-        return self.do_graphql_query(
+        return self._cached_lookup(
             "FetchInstitutionalTransfer",
-            {"id": transfer_id},
-            "accountTransfer",
-            "object",
+            transfer_id,
+            lambda: self.do_graphql_query(
+                "FetchInstitutionalTransfer",
+                {"id": transfer_id},
+                "accountTransfer",
+                "object",
+            ),
         )
 
     def set_security_market_data_cache(
@@ -613,6 +1311,8 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         self.security_market_data_cache_setter = security_market_data_cache_setter
 
     def get_security_market_data(self, security_id: str, use_cache: bool = True):
+        # Quotes change, so market data is only cached by the caller's own cache (see
+        # security_market_data_cache_getter/setter), following its expiry policy
         if (
             not self.security_market_data_cache_getter
             or not self.security_market_data_cache_setter
@@ -636,6 +1336,62 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
 
         return value
 
+    def get_securities_market_data(
+        self, security_ids: list[str], use_cache: bool = True
+    ) -> dict[str, dict]:
+        """Retrieve the market data of many securities, using a single GraphQL query
+        per SECURITY_MARKET_DATA_BATCH_SIZE securities that are not already cached.
+
+        Args:
+            security_ids: The IDs of the securities to look up.
+            use_cache: Whether to use (and populate) the cache, like
+                get_security_market_data does.
+
+        Returns:
+            dict: The market data of each security that was found, by security ID.
+        """
+        found = {}
+        missing = []
+        use_external_cache = use_cache and bool(
+            self.security_market_data_cache_getter
+            and self.security_market_data_cache_setter
+        )
+        for security_id in dict.fromkeys(security_ids):
+            if use_external_cache:
+                cached_value = self.security_market_data_cache_getter(security_id)
+                if cached_value:
+                    found[security_id] = cached_value
+                    continue
+            missing.append(security_id)
+
+        batch_size = self.SECURITY_MARKET_DATA_BATCH_SIZE
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            query, headers = self._build_graphql_request(
+                "FetchSecuritiesMarketData",
+                {f"id{i}": security_id for i, security_id in enumerate(batch)},
+                _security_market_data_batch_query(len(batch)),
+            )
+            response_data = self.send_post(self.GRAPHQL_URL, query, headers)
+            data = (
+                response_data.get("data") if isinstance(response_data, dict) else None
+            )
+            if not isinstance(data, dict):
+                raise WSApiException(
+                    "GraphQL query failed: FetchSecuritiesMarketData", response_data
+                )
+
+            for i, security_id in enumerate(batch):
+                value = data.get(f"s{i}")
+                if not isinstance(value, dict):
+                    # Unknown (e.g. delisted) security
+                    continue
+                if use_external_cache:
+                    value = self.security_market_data_cache_setter(security_id, value)
+                found[security_id] = value
+
+        return found
+
     def get_security_historical_quotes(self, security_id, time_range="1m"):
         """Fetch historical quotes for a security using GraphQL query.
 
@@ -682,13 +1438,17 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
 
     def get_corporate_action_child_activities(self, activity_canonical_id):
         # Fetch details about a corporate action (eg. a split) using GraphQL query
-        return self.do_graphql_query(
+        return self._cached_lookup(
             "FetchCorporateActionChildActivities",
-            {
-                "activityCanonicalId": activity_canonical_id,
-            },
-            "corporateActionChildActivities.nodes",
-            "array",
+            activity_canonical_id,
+            lambda: self.do_graphql_query(
+                "FetchCorporateActionChildActivities",
+                {
+                    "activityCanonicalId": activity_canonical_id,
+                },
+                "corporateActionChildActivities.nodes",
+                "array",
+            ),
         )
 
     def get_statement_transactions(self, account_id: str, period: str) -> list[Any]:
@@ -718,10 +1478,8 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         transactions = []
         if isinstance(statements, list) and len(statements) > 0:
             statement = statements[0]
-            data = statement.get("data") if "data" in statement else {}
-            transactions = (
-                data.get("currentTransactions") if "currentTransactions" in data else []
-            )
+            data = statement.get("data") or {}
+            transactions = data.get("currentTransactions") or []
 
         if not isinstance(transactions, list):
             raise WSApiException(
@@ -749,7 +1507,7 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
         positions = self.do_graphql_query(
             "FetchIdentityPositions",
             {
-                "identityId": self.get_token_info().get("identity_canonical_id"),
+                "identityId": self.identity_id,
                 "currency": currency,
                 "filter": {"securityIds": security_ids},
                 "includeAccountData": True,
@@ -800,7 +1558,7 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
             WSApiException: If the response format is unexpected.
         """
         variables = {
-            "identityId": self.get_token_info().get("identity_canonical_id"),
+            "identityId": self.identity_id,
             "currency": currency,
         }
         if account_ids is not None:
@@ -860,7 +1618,7 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
             WSApiException: If the response format is unexpected.
         """
         variables = {
-            "identityId": self.get_token_info().get("identity_canonical_id"),
+            "identityId": self.identity_id,
             "currency": currency,
         }
         if account_ids is not None:
@@ -901,7 +1659,7 @@ class WealthsimpleAPI(WealthsimpleAPIBase):
             WSApiException: If the response format is unexpected.
         """
         variables = {
-            "identityId": self.get_token_info().get("identity_canonical_id"),
+            "identityId": self.identity_id,
             "currency": currency,
             "includeIssuingSecurityBreakdown": include_issuing_security_breakdown,
         }
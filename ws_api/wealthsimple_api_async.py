@@ -0,0 +1,150 @@
+import asyncio
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING, Any
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - depends on the installed extras
+    httpx = None
+
+from ws_api._json import JSONDecodeError, dumps, loads
+from ws_api.exceptions import CurlException, UnexpectedException
+from ws_api.session import WSAPISession
+from ws_api.wealthsimple_api import WealthsimpleAPI
+
+if TYPE_CHECKING:
+    # typing.Self needs Python 3.11
+    from typing_extensions import Self
+
+
+class WealthsimpleAPIAsync(WealthsimpleAPI):
+    """WealthsimpleAPI with asynchronous variants of its queries.
+
+    Requests made by the *_async methods share a single HTTP/2 httpx.AsyncClient, so
+    that independent queries (e.g. the balances of many accounts) can run
+    concurrently. The synchronous methods inherited from WealthsimpleAPI keep working
+    as before.
+
+    Requires the `async` extra: pip install "ws-api[async]"
+
+    Example:
+        async with WealthsimpleAPIAsync.from_token(session) as ws:
+            balances = await ws.get_account_balances_many(account_ids)
+    """
+
+    def __init__(self, sess: WSAPISession | None = None) -> None:
+        if httpx is None:
+            raise ImportError(
+                'WealthsimpleAPIAsync requires httpx; install it with: pip install "ws-api[async]"'
+            )
+        super().__init__(sess)
+        self._async_http = httpx.AsyncClient(http2=True)
+
+    async def __aenter__(self) -> "Self":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._async_http.aclose()
+        self.close()
+
+    async def send_http_request_async(
+        self,
+        url: str,
+        method: str = "POST",
+        data: dict | None = None,
+        headers: Mapping[str, str] | None = None,
+    ) -> Any:
+        headers = self._build_request_headers(method, data, headers)
+
+        try:
+            response = await self._async_http.request(
+                method,
+                url,
+                content=dumps(data) if data is not None else None,
+                headers=headers,
+            )
+            return loads(response.content)
+        except (httpx.HTTPError, JSONDecodeError) as e:
+            raise CurlException(f"HTTP request failed: {e}")
+
+    async def do_graphql_query_async(
+        self,
+        query_name: str,
+        variables: dict,
+        data_response_path: str,
+        expect_type: str,
+        filter_fn: Callable[[Any], bool] | None = None,
+        *,
+        load_all_pages: bool = False,
+    ):
+        if load_all_pages and expect_type != "array":
+            raise UnexpectedException(
+                "Can't load all pages for GraphQL queries that do not return arrays"
+            )
+
+        results = []
+        while True:
+            query, headers = self._build_graphql_request(query_name, variables)
+            response_data = await self.send_http_request_async(
+                self.GRAPHQL_URL, "POST", query, headers
+            )
+            data, end_cursor = self._parse_graphql_response(
+                query_name, response_data, data_response_path, expect_type, filter_fn
+            )
+            if not load_all_pages:
+                return data
+
+            # Pages are cursor-based, so each one needs the previous one's endCursor
+            results.extend(data)
+            if not end_cursor:
+                return results
+            variables["cursor"] = end_cursor
+
+    async def do_graphql_queries(self, specs: list[tuple]) -> list:
+        """Run several GraphQL queries concurrently.
+
+        Args:
+            specs: One (query_name, variables, data_response_path, expect_type[,
+                filter_fn]) tuple per query, as passed to do_graphql_query_async.
+
+        Returns:
+            list: The result of each query, in the same order as specs.
+        """
+        return list(
+            await asyncio.gather(
+                *(self.do_graphql_query_async(*spec) for spec in specs)
+            )
+        )
+
+    async def get_account_balances_async(self, account_id: str) -> dict:
+        accounts = await self.do_graphql_query_async(
+            "FetchAccountsWithBalance",
+            {
+                "type": "TRADING",
+                "ids": [account_id],
+            },
+            "accounts",
+            "array",
+        )
+
+        # Security symbols may need (blocking) lookups; keep them off the event loop
+        return await asyncio.to_thread(self._extract_balances, accounts[0])
+
+    async def get_account_balances_many(
+        self, account_ids: list[str]
+    ) -> dict[str, dict]:
+        """Retrieve the balances of many accounts concurrently.
+
+        Args:
+            account_ids: The IDs of the accounts to retrieve balances for.
+
+        Returns:
+            dict: The balances of each account (see get_account_balances), by account ID.
+        """
+        balances = await asyncio.gather(
+            *(self.get_account_balances_async(account_id) for account_id in account_ids)
+        )
+        return dict(zip(account_ids, balances))